@@ -0,0 +1,351 @@
+#! /usr/bin/env python
+
+"""
+This script benchmarks split-tiles.py and generate-lod.py on synthetic
+images and tile directories of several sizes, tile sizes and formats, and
+the tile encoders on sample tiles, and saves the results as JSON so that
+runs can be compared over time.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import cv2
+
+from vttools import encoders
+from vttools.verify import TILE_RE
+
+here = os.path.dirname(os.path.abspath(__file__))
+
+"""
+Parses a comma-separated list of integers.
+"""
+def int_list(x):
+    try:
+        return [int(v) for v in x.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError("%r not a comma-separated list of integers" % x)
+
+def synthetic_image(width, height, seed=0):
+    """
+    Generates a BGR image with smooth gradients and some noise, which
+    compresses roughly like real imagery.
+    """
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 8 * np.pi, width, dtype=np.float32)
+    y = np.linspace(0, 4 * np.pi, height, dtype=np.float32)
+    base = 96.0 + 64.0 * np.sin(x)[np.newaxis, :] * np.cos(y)[:, np.newaxis]
+    im = np.empty((height, width, 3), dtype=np.uint8)
+    for b in range(3):
+        noise = rng.integers(0, 32, size=(height, width), dtype=np.uint8)
+        im[:, :, b] = np.clip(base + b * 16.0, 0, 223).astype(np.uint8) + noise
+    return im
+
+def write_level(directory, level, tilesize, fmt):
+    """
+    Writes all the synthetic tiles of a level to the given directory.
+    """
+    os.makedirs(directory, exist_ok=True)
+    cols, rows = 2 ** (level + 1), 2 ** level
+    im = synthetic_image(cols * tilesize, rows * tilesize, seed=level)
+    for r in range(rows):
+        for c in range(cols):
+            tile = im[r * tilesize:(r + 1) * tilesize, c * tilesize:(c + 1) * tilesize]
+            cv2.imwrite(os.path.join(directory, f"tx_{c}_{r}.{fmt}"), tile)
+
+def dir_stats(directory, exclude=()):
+    """
+    Returns the number of tile files and the total bytes under directory.
+    """
+    tiles = 0
+    nbytes = 0
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) not in exclude]
+        for f in files:
+            path = os.path.join(root, f)
+            if path in exclude:
+                continue
+            nbytes += os.path.getsize(path)
+            if f.startswith("tx_"):
+                tiles += 1
+    return tiles, nbytes
+
+def run(cmd, cwd):
+    """
+    Runs a command and returns (wall seconds, peak RSS in bytes) of the child.
+    """
+    # stderr goes to a file, a pipe would block the child once its buffer is full.
+    with tempfile.TemporaryFile() as err:
+        start = time.perf_counter()
+        p = subprocess.Popen(cmd, cwd=cwd, stdout=subprocess.DEVNULL, stderr=err)
+        # wait4 gives the peak RSS of this child alone, unlike RUSAGE_CHILDREN.
+        _, status, usage = os.wait4(p.pid, 0)
+        elapsed = time.perf_counter() - start
+        code = os.waitstatus_to_exitcode(status)
+        # The child is reaped, tell Popen so it does not wait for it again.
+        p.returncode = code
+        if code != 0:
+            err.seek(0)
+            raise RuntimeError("%s failed (%d): %s" % (" ".join(cmd), code, err.read().decode(errors="replace")))
+    # ru_maxrss is in KiB on Linux and in bytes on macOS.
+    rss = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    return elapsed, rss
+
+def best_of(repeats, fn):
+    """
+    Runs fn() (which returns a result dict) repeats times, and keeps the fastest.
+    """
+    results = [fn() for _ in range(repeats)]
+    return min(results, key=lambda r: r["seconds"])
+
+def bench_split(workdir, level, tilesize, fmt, repeats):
+    width, height = 2 ** (level + 1) * tilesize, 2 ** level * tilesize
+    source = os.path.join(workdir, f"source_{width}x{height}.png")
+    if not os.path.exists(source):
+        cv2.imwrite(source, synthetic_image(width, height), [int(cv2.IMWRITE_PNG_COMPRESSION), 1])
+
+    def once():
+        out = tempfile.mkdtemp(dir=workdir)
+        try:
+            seconds, rss = run([sys.executable, os.path.join(here, "split-tiles.py"), str(tilesize), source, "-f", fmt], out)
+            tiles, nbytes = dir_stats(out)
+        finally:
+            shutil.rmtree(out)
+        return {"seconds": seconds, "peak_rss": rss, "tiles": tiles, "bytes_written": nbytes}
+
+    r = best_of(repeats, once)
+    r.update({"benchmark": "split", "width": width, "height": height, "level": level,
+              "tilesize": tilesize, "format": fmt,
+              "mpx_per_sec": width * height / 1e6 / r["seconds"],
+              "tiles_per_sec": r["tiles"] / r["seconds"]})
+    return r
+
+def bench_lod(workdir, level, tilesize, fmt, repeats):
+    source = os.path.join(workdir, f"level{level}_{tilesize}_{fmt}")
+    if not os.path.exists(source):
+        write_level(source, level, tilesize, fmt)
+    width, height = 2 ** (level + 1) * tilesize, 2 ** level * tilesize
+
+    def once():
+        out = tempfile.mkdtemp(dir=workdir)
+        try:
+            seconds, rss = run([sys.executable, os.path.join(here, "generate-lod.py"), str(level), source, "-f", fmt], out)
+            tiles, nbytes = dir_stats(out)
+        finally:
+            shutil.rmtree(out)
+        return {"seconds": seconds, "peak_rss": rss, "tiles": tiles, "bytes_written": nbytes}
+
+    r = best_of(repeats, once)
+    r.update({"benchmark": "lod", "width": width, "height": height, "level": level,
+              "tilesize": tilesize, "format": fmt,
+              "mpx_per_sec": width * height / 1e6 / r["seconds"],
+              "tiles_per_sec": r["tiles"] / r["seconds"]})
+    return r
+
+def sample_tiles(directory, tilesizes, count):
+    """
+    Up to count tiles of each size. The tiles are read from the tx_C_R image
+    files in directory when given (real imagery gives representative sizes),
+    and synthetic otherwise. The tiles of a level all have the same size, so
+    reading stops at the first size with count tiles.
+    return:
+        {tilesize: [tiles]}
+    """
+    samples = {}
+    if directory is not None:
+        for name in sorted(os.listdir(directory)):
+            if not TILE_RE.match(name):
+                continue
+            tile = cv2.imread(os.path.join(directory, name), cv2.IMREAD_COLOR)
+            if tile is not None and tile.shape[0] == tile.shape[1]:
+                group = samples.setdefault(tile.shape[0], [])
+                group.append(tile)
+                if len(group) == count:
+                    break
+        return samples
+    for tilesize in tilesizes:
+        im = synthetic_image(count * tilesize, tilesize, seed=tilesize)
+        samples[tilesize] = [im[:, i * tilesize:(i + 1) * tilesize].copy() for i in range(count)]
+    return samples
+
+def psnr(a, b):
+    mse = np.mean((a.astype(np.float64) - b.astype(np.float64)) ** 2)
+    return float("inf") if mse == 0 else 10.0 * np.log10(255.0 ** 2 / mse)
+
+def bench_encode(tiles, encoder, repeats):
+    """
+    Encodes and decodes the tiles with the encoder (decoding with the same
+    backend), keeping the fastest of repeats runs of each.
+    """
+    encode_s = decode_s = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        data = [bytes(encoder.encode(t)) for t in tiles]
+        encode_s = min(encode_s, time.perf_counter() - start)
+        start = time.perf_counter()
+        decoded = [encoders.decode(d, encoder.backend) for d in data]
+        decode_s = min(decode_s, time.perf_counter() - start)
+    tilesize = tiles[0].shape[0]
+    nbytes = sum(len(d) for d in data) / len(tiles)
+    return {"benchmark": "encode", "tilesize": tilesize, "format": encoder.format,
+            "backend": encoder.backend, "quality": encoder.quality if encoder.format != "png" else None,
+            "tiles": len(tiles), "seconds": encode_s + decode_s,
+            "encode_ms": encode_s * 1e3 / len(tiles), "decode_ms": decode_s * 1e3 / len(tiles),
+            "bytes_per_tile": nbytes, "bits_per_pixel": nbytes * 8 / (tilesize * tilesize),
+            "min_psnr": min(psnr(t, d[:, :, :3]) for t, d in zip(tiles, decoded))}
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=here,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_result(r):
+    if r["benchmark"] == "encode":
+        quality = "" if r["quality"] is None else f" q={r['quality']}"
+        print(f"encode tile={r['tilesize']} {r['format']} ({r['backend']}{quality}): "
+              f"encode {r['encode_ms']:.2f} ms  decode {r['decode_ms']:.2f} ms  "
+              f"{r['bytes_per_tile'] / 1024:.1f} KiB/tile  {r['bits_per_pixel']:.2f} bpp  min psnr {r['min_psnr']:.1f} dB")
+        return
+    print(f"{r['benchmark']:5s} L{r['level']:02d} {r['width']}x{r['height']} tile={r['tilesize']} {r['format']}: "
+          f"{r['seconds']:.2f}s  {r['mpx_per_sec']:.1f} Mpx/s  {r['tiles_per_sec']:.1f} tiles/s  "
+          f"rss={r['peak_rss'] / 2**20:.0f} MiB  written={r['bytes_written'] / 2**20:.1f} MiB")
+
+def key(r):
+    return (r["benchmark"], r.get("level"), r["tilesize"], r["format"], r.get("backend"), r.get("quality"))
+
+def compare(old_file, new_file):
+    """
+    Prints the relative change of every benchmark present in both files.
+    """
+    with open(old_file) as f:
+        old = {key(r): r for r in json.load(f)["results"]}
+    with open(new_file) as f:
+        new = {key(r): r for r in json.load(f)["results"]}
+    for k in sorted(old.keys() & new.keys(), key=str):
+        o, n = old[k], new[k]
+        if k[0] == "encode":
+            print(f"encode tile={k[2]} {k[3]} ({k[4]} q={k[5]}): "
+                  f"encode {n['encode_ms'] / o['encode_ms']:.2f}x  "
+                  f"decode {n['decode_ms'] / o['decode_ms']:.2f}x  "
+                  f"bytes {n['bytes_per_tile'] / o['bytes_per_tile']:.2f}x")
+            continue
+        print(f"{k[0]:5s} L{k[1]:02d} tile={k[2]} {k[3]}: "
+              f"time {n['seconds'] / o['seconds']:.2f}x  "
+              f"rss {n['peak_rss'] / o['peak_rss']:.2f}x  "
+              f"bytes {n['bytes_written'] / max(o['bytes_written'], 1):.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark split-tiles.py and generate-lod.py on synthetic inputs, and save the results as JSON.')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    for name, description in (('split', 'Benchmark split-tiles.py.'),
+                       ('lod', 'Benchmark generate-lod.py (full pyramid build).'),
+                       ('all', 'Benchmark both.')):
+        p = sub.add_parser(name, help=description)
+        p.add_argument('-l', '--levels', type=int_list, default=[2, 3, 4],
+                       help='Comma-separated SVT levels of the synthetic inputs. An input at level L is 2^(L+1)x2^L tiles. Defaults to 2,3,4.')
+        p.add_argument('-s', '--tilesizes', type=int_list, default=[256, 512],
+                       help='Comma-separated tile sizes. Defaults to 256,512.')
+        p.add_argument('-f', '--formats', type=lambda x: x.split(','), default=['jpg', 'png'],
+                       help='Comma-separated output formats. Defaults to jpg,png.')
+        p.add_argument('-n', '--repeats', type=int, default=3,
+                       help='Runs per configuration; the fastest is kept. Defaults to 3.')
+        p.add_argument('-o', '--output', type=str, default=None,
+                       help='JSON file to save the results to.')
+        p.add_argument('-w', '--workdir', type=str, default=None,
+                       help='Directory for the synthetic inputs and outputs. Defaults to a temporary directory.')
+
+    p = sub.add_parser('encode', help='Benchmark the tile encoders: encode time, decode time and bytes per tile.')
+    p.add_argument('-i', '--input', type=str, default=None, metavar='DIR',
+                   help='Directory with sample tiles, e.g. a level of real imagery. Defaults to synthetic tiles.')
+    p.add_argument('-s', '--tilesizes', type=int_list, default=[256, 512],
+                   help='Comma-separated sizes of the synthetic tiles. Defaults to 256,512.')
+    p.add_argument('-t', '--tiles', type=int, default=16,
+                   help='Sample tiles per size. Defaults to 16.')
+    p.add_argument('-f', '--formats', type=lambda x: x.split(','), default=list(encoders.FORMATS),
+                   help='Comma-separated formats. Defaults to %s.' % ','.join(encoders.FORMATS))
+    p.add_argument('-b', '--backends', type=lambda x: x.split(','), default=list(encoders.BACKENDS),
+                   help='Comma-separated encoder backends. Defaults to %s.' % ','.join(encoders.BACKENDS))
+    p.add_argument('-q', '--qualities', type=int_list, default=[80, 90],
+                   help='Comma-separated qualities of the lossy formats. Defaults to 80,90.')
+    p.add_argument('-n', '--repeats', type=int, default=3,
+                   help='Runs per configuration; the fastest is kept. Defaults to 3.')
+    p.add_argument('-o', '--output', type=str, default=None,
+                   help='JSON file to save the results to.')
+
+    p = sub.add_parser('compare', help='Compare two JSON result files.')
+    p.add_argument('OLD', type=str, help='Baseline results.')
+    p.add_argument('NEW', type=str, help='New results.')
+
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        compare(args.OLD, args.NEW)
+        sys.exit(0)
+
+    results = []
+    if args.command == 'encode':
+        samples = sample_tiles(args.input, args.tilesizes, args.tiles)
+        if not samples:
+            print("No square sample tiles found in %s" % args.input)
+            sys.exit(1)
+        for tilesize, tiles in sorted(samples.items()):
+            for backend in args.backends:
+                for fmt in args.formats:
+                    for quality in (args.qualities if fmt != 'png' else args.qualities[:1]):
+                        try:
+                            encoder = encoders.Encoder(fmt, quality, backend)
+                            encoder.probe()
+                        except ValueError as e:
+                            print(f"encode {fmt} ({backend}): skipped, {e}")
+                            continue
+                        r = bench_encode(tiles, encoder, args.repeats)
+                        print_result(r)
+                        results.append(r)
+
+    benches = []
+    if args.command in ('split', 'all'):
+        benches.append(bench_split)
+    if args.command in ('lod', 'all'):
+        benches.append(bench_lod)
+
+    workdir = None
+    if benches:
+        workdir = args.workdir or tempfile.mkdtemp(prefix="svt-bench-")
+        os.makedirs(workdir, exist_ok=True)
+    try:
+        for bench in benches:
+            for level in args.levels:
+                for tilesize in args.tilesizes:
+                    for fmt in args.formats:
+                        r = bench(workdir, level, tilesize, fmt, args.repeats)
+                        print_result(r)
+                        results.append(r)
+    finally:
+        if benches and args.workdir is None:
+            shutil.rmtree(workdir)
+
+    if args.output is not None:
+        report = {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results saved to {args.output}")
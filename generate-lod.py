@@ -7,135 +7,57 @@ all the levels to the top.
 """
 
 import argparse
-import os
-import numpy as np
-import cv2
 import sys
-import re
 
-"""
-Checks a JPG quality integer parameter.
-"""
-def quality_int(x):
-    try: 
-        x = int(x)
-    except ValueError:
-        raise argparse.ArgumentTypeError("%r not an integer" % x)
-
-    if x <= 0 or x > 100:
-        raise argparse.ArgumentTypeError("%r not in range [1, 100]" % x)
-
-    return x
-
-# Instantiate the parser
-parser = argparse.ArgumentParser(description='Generate the upper LOD levels from a certain level tile files. Each level L is put in the \'levelL\' directory.')
-
-# Required positional arguments
-parser.add_argument('LEVEL', type=int,
-                    help='The level of the input directory.')
-parser.add_argument('DIRECTORY', type=str,
-                    help='The input directory, containing the tiles for the specified level.')
-# Optional arguments
-parser.add_argument('-f', '--format', type=str, choices=['jpg', 'png'], default='jpg',
-                    help='Defines the format of the output images. Defaults to jpg.')
-parser.add_argument('-q', '--quality', type=quality_int, default=95,
-                    help='If the format is JPG, this defines the quality setting in [1,100]. Defaults to 95.')
-
-args = parser.parse_args()
-
-
-
-"""
-Processes the tiles of the given level, and produces the tiles of level-1.
-"""
-def process_level(level, dir):
-    if not os.path.exists(dir):
-        print(f"Directory for level {level:02d} not found: {dir}")
+from vttools import encoders, metrics
+from vttools.lod import build_pyramid, merge_shards
+from vttools.shard import parse_shard, shard_level
+
+
+def parse_args():
+    # Instantiate the parser
+    parser = argparse.ArgumentParser(description='Generate the upper LOD levels from a certain level tile files. Each level L is put in the \'levelLL\' directory.')
+
+    # Required positional arguments
+    parser.add_argument('LEVEL', type=int,
+                        help='The level of the input directory.')
+    parser.add_argument('DIRECTORY', type=str,
+                        help='The input directory, containing the tiles for the specified level.')
+    # Optional arguments
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--shard', type=parse_shard, default=None, metavar='I/N',
+                       help='Only produce the tiles owned by shard I of N (zero-based), down to the shard level. The levels above are produced by --merge. LEVEL must be below the shard level.')
+    group.add_argument('--merge', type=int, default=None, metavar='N',
+                       help='Finish the levels above the shard level of an N-shard run. LEVEL must be the shard level, and DIRECTORY must contain its tiles from all shards.')
+    encoders.add_arguments(parser)
+    metrics.add_arguments(parser)
+
+    args = parser.parse_args()
+    if args.merge is not None and args.LEVEL != shard_level(args.merge):
+        parser.error(f"The shard level for {args.merge} shards is {shard_level(args.merge)}, not {args.LEVEL}.")
+    if args.shard is not None and args.LEVEL <= shard_level(args.shard[1]):
+        ls = shard_level(args.shard[1])
+        parser.error(f"With {args.shard[1]} shards, LEVEL must be below the shard level {ls}, so that each shard owns tiles. "
+                     f"Run it without --shard, or gather level{ls:02d} and use --merge {args.shard[1]}.")
+    return args
+
+if __name__ == "__main__":
+    args = parse_args()
+    m = metrics.from_args(args, label="lod")
+
+    # Start with requested level
+    try:
+        encoder = encoders.from_args(args)
+        if args.merge is not None:
+            merge_shards(args.merge, args.DIRECTORY, metrics=m, encoder=encoder)
+        else:
+            build_pyramid(args.LEVEL, args.DIRECTORY, shard=args.shard, metrics=m, encoder=encoder)
+    except (FileNotFoundError, ValueError) as e:
+        print(e)
         sys.exit(-1)
+    m.close()
 
-    print(f"Processing level: {level:02d} ({dir})")
-
-    directory = os.fsencode(dir)
-
-    if len(os.listdir(directory)) < 4:
-        print("Not enoguh tiles to continue!")
-        return False
-
-    mincol = 999999999999
-    minrow = 999999999999
-    maxcol = 0
-    maxrow = 0
-    for file in os.listdir(directory):
-        filename = os.fsdecode(file)
-        ok = re.search(r"^tx_\d+_\d+\.\w+", filename)
-        if ok is not None:
-            name = os.path.splitext(filename)[0]
-            tokens = name.split('_')
-            col = int(tokens[1])
-            row = int(tokens[2])
-            if col > maxcol:
-                maxcol = col
-            if col < mincol:
-                mincol = col
-            if row > maxrow:
-                maxrow = row
-            if row < minrow:
-                minrow = row
-
-    # MxN matrix 
-    M = maxrow + 1
-    N = maxcol + 1
-    # Create matrix of tiles
-    tiles = [[ 0 for i in range(0, N) ] for j in range(0, M)]
-    # Fill it with files
-    for file in os.listdir(directory):
-        filename = os.fsdecode(file)
-        ok = re.search(r"^tx_\d+_\d+\.\w+", filename)
-        if ok is not None:
-            name = os.path.splitext(filename)[0]
-            tokens = name.split('_')
-            col = int(tokens[1])
-            row = int(tokens[2])
-            tiles[row][col] = filename
-
-    l = level - 1
-    leveldir = f"level{l:02d}" + str(l)
-    if not os.path.exists(leveldir):
-        os.makedirs(leveldir)
-
-    # Every 4 tiles, we join them into one, and downsize it.
-    for i in range(mincol, N, 2): # col
-        for j in range(minrow, M, 2): # row
-            file00 = os.path.join(dir, tiles[j][i])
-            im00 = cv2.imread(file00)   
-            file10 = os.path.join(dir, tiles[j][i+1])
-            im10 = cv2.imread(file10)   
-            file01 = os.path.join(dir, tiles[j+1][i])
-            im01 = cv2.imread(file01)   
-            file11 = os.path.join(dir, tiles[j+1][i+1])
-            im11 = cv2.imread(file11)
-
-            # Actually stitch
-            # im00-im10 -> im0
-            # im01-im11 -> im1
-            im0= np.concatenate((im00, im10), axis=1)
-            im1 = np.concatenate((im01, im11), axis=1)
-            im = np.concatenate((im0, im1), axis=0)
-
-            tilesize = im00.shape[0]
-            # Resize to tile size
-            tile = cv2.resize(im, dsize=(tilesize, tilesize), interpolation=cv2.INTER_CUBIC) 
-    
-            outfilename = "tx_" + str(int(i/2)) + "_" + str(int(j/2)) + "." + args.format
-            out = os.path.join(leveldir, outfilename)
-            cv2.imwrite(out, tile, [int(cv2.IMWRITE_JPEG_QUALITY), args.quality])
-
-    good = True
-    if good and l > 0:
-        # Process next level up.
-        good = process_level(l, leveldir)
-
-    return True
-
-# Start with requested level
-process_level(args.LEVEL, args.DIRECTORY)
+    if args.shard is not None:
+        ls = shard_level(args.shard[1])
+        print(f"Shard {args.shard[0]}/{args.shard[1]} done down to level {ls:02d}.")
+        print(f"Gather level{ls:02d} from all shards, then run: generate-lod.py {ls} level{ls:02d} --merge {args.shard[1]}")
@@ -6,105 +6,60 @@ NxM tiles, and names them "tx_i_j.ext".
 """
 
 import argparse
-import os.path
-import numpy as np
+import os
 import sys
 
-# This is so that OpenCV supports images larger than 2^30 pixels (32768^2).
-# 2^40 supports 1048576x1048576 images.
-os.environ["OPENCV_IO_MAX_IMAGE_PIXELS"] = pow(2,40).__str__()
-import cv2
-
-"""
-Checks a JPG quality integer parameter.
-"""
-def quality_int(x):
-    try: 
-        x = int(x)
-    except ValueError:
-        raise argparse.ArgumentTypeError("%r not an integer" % x)
-
-    if x <= 0 or x > 100:
-        raise argparse.ArgumentTypeError("%r not in range [1, 100]" % x)
-
-    return x
-
-"""
-Checks a file parameter.
-"""
-def is_valid_file(parser, arg):
-    if not os.path.exists(arg):
-        parser.error("The file %s does not exist!" % arg)
-    else:
-        return arg  # return the string
-
-def load_image( infilename ) :
-    return cv2.imread(infilename)
-
-
-# Instantiate the parser
-parser = argparse.ArgumentParser(description='Split the given input image into tiles of NxN pixels, named tx_C_R.ext, where C is the column and R is the row, all zero-based.')
-
-# Required positional arguments
-parser.add_argument('RESOLUTION', type=int,
-                    help='Resolution of the produced tiles.')
-parser.add_argument('FILE',
-                    type=lambda x: is_valid_file(parser, x),
-                    help='The input image. Must have a 1:1 or 2:1 aspect ratio.')
-# Optional arguments
-parser.add_argument('-c', '--startcol', type=int, default=0,
-                    help='Starting column to use in the file names of the produced tiles.')
-parser.add_argument('-r', '--startrow', type=int, default=0,
-                    help='Starting row to use in the file names of the produced tiles.')
-parser.add_argument('-f', '--format', type=str, choices=['jpg', 'png'], default='jpg',
-                    help='Defines the format of the output images. Defaults to jpg.')
-parser.add_argument('-q', '--quality', type=quality_int, default=95,
-                    help='If the format is JPG, this defines the quality setting in [1,100]. Defaults to 95.')
-
-args = parser.parse_args()
-
-    
-
-print("Input: %s" % args.FILE)
-
-if args.FILE.endswith('.tif'):
-    # GeoTIFF file
-    import tifutils as tu
-    im, ds = tu.tif2array(args.FILE, False)
-    print(im.shape)
-    sys.exit(-1)
-
-else:
-    im = load_image(args.FILE)
-
-print("Mode: ", im.shape)
-
-
-# Split image
-M = args.RESOLUTION
-N = args.RESOLUTION
-
-# Check divisibility
-if im.shape[0] % N != 0:
-    print("Error: image height not divisible by tile size: %d -> %d" % (im.shape[0], N))
-    sys.exit(1)
-if im.shape[1] % M != 0:
-    print("Error: image width not divisible by tile size: %d -> %d" % (im.shape[1], M))
-    sys.exit(1)
-
-tiles = [im[x:x+M,y:y+N] for x in range(0,im.shape[0],M) for y in range(0,im.shape[1],N)]
-
-cols = im.shape[1] / M
-rows = im.shape[0] / N
-
-c = 0
-r = 0
-for count, tile in enumerate(tiles):
-    fname = 'tx_' + str(c + args.startcol) + '_' + str(r + args.startrow) + '.' + args.format
-    print("Writing %s" % fname)
-    cv2.imwrite(fname, tile, [int(cv2.IMWRITE_JPEG_QUALITY), args.quality])
-
-    c = int((c + 1) % cols)
-    if c == 0:
-        r = r + 1
-
+from vttools import cli, encoders, metrics
+from vttools.memory import parse_size
+from vttools.shard import parse_shard
+from vttools.split import parse_bbox, parse_window, split_image
+
+
+def parse_args():
+    # Instantiate the parser
+    parser = argparse.ArgumentParser(description='Split the given input image into tiles of NxN pixels, named tx_C_R.ext, where C is the column and R is the row, all zero-based.')
+
+    # Required positional arguments
+    parser.add_argument('RESOLUTION', type=int,
+                        help='Resolution of the produced tiles.')
+    parser.add_argument('FILE',
+                        type=lambda x: cli.is_valid_file(parser, x),
+                        help='The input image. Must have a 1:1 or 2:1 aspect ratio.')
+    # Optional arguments
+    parser.add_argument('-c', '--startcol', type=int, default=0,
+                        help='Starting column to use in the file names of the produced tiles.')
+    parser.add_argument('-r', '--startrow', type=int, default=0,
+                        help='Starting row to use in the file names of the produced tiles.')
+    parser.add_argument('-l', '--level', type=int, default=None,
+                        help='SVT level of the produced tiles. Only needed with --shard or --bbox, when the image is not a full 2:1 level starting at column and row 0.')
+    parser.add_argument('--shard', type=parse_shard, default=None, metavar='I/N',
+                        help='Only write the tiles owned by shard I of N (zero-based), for distributed runs.')
+    region = parser.add_mutually_exclusive_group()
+    region.add_argument('--window', type=parse_window, default=None, metavar='X,Y,W,H',
+                        help='Only re-tile the region of W x H pixels at X,Y of the input image, snapped outwards to the tile grid. Only the tiles in the region are written, with the names of a full split.')
+    region.add_argument('--bbox', type=parse_bbox, default=None, metavar='LON0,LAT0,LON1,LAT1',
+                        help='Only re-tile the tiles of the level that intersect the given bounding box, in degrees. Only the tiles in the box are written, with the names of a full split.')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(),
+                        help='Number of encoding threads. Defaults to the number of CPUs, and is lowered to fit --max-memory.')
+    parser.add_argument('--max-memory', type=parse_size, default=None, metavar='SIZE',
+                        help='Memory budget, e.g. 512M or 4G. The strip height, queue depth and concurrency are chosen to fit it, and runs that cannot fit fail before starting.')
+    encoders.add_arguments(parser)
+    metrics.add_arguments(parser)
+
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    m = metrics.from_args(args, label="split")
+
+    print("Input: %s" % args.FILE)
+    try:
+        encoder = encoders.from_args(args)
+        written = split_image(args.FILE, args.RESOLUTION, args.startcol, args.startrow,
+                              level=args.level, shard=args.shard, window=args.window, bbox=args.bbox,
+                              workers=args.workers, max_memory=args.max_memory, metrics=m, encoder=encoder)
+    except ValueError as e:
+        print("Error: %s" % e)
+        sys.exit(1)
+    m.close()
+    print("Done. Wrote %d tiles." % written)
@@ -0,0 +1,91 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from vttools import headers, split
+from vttools.memory import BASE_BYTES
+from vttools.split import split_image
+
+def tiles(directory):
+    return {name: open(os.path.join(directory, name), "rb").read() for name in os.listdir(directory)}
+
+@pytest.mark.parametrize("channels", [1, 4])
+def test_window_matches_full_split(tmp_path, channels):
+    rng = np.random.default_rng(channels)
+    shape = (128, 256) if channels == 1 else (128, 256, channels)
+    source = str(tmp_path / "source.png")
+    cv2.imwrite(source, rng.integers(0, 256, size=shape, dtype=np.uint8))
+
+    full = tmp_path / "full"
+    split_image(source, 32, format="png", outdir=str(full))
+    region = tmp_path / "region"
+    split_image(source, 32, format="png", outdir=str(region), window=(40, 10, 50, 30), startcol=2)
+
+    full_tiles = tiles(full)
+    region_tiles = tiles(region)
+    # Columns 1-2 and rows 0-1, named from startcol 2.
+    assert sorted(region_tiles) == ["tx_3_0.png", "tx_3_1.png", "tx_4_0.png", "tx_4_1.png"]
+    for name, data in region_tiles.items():
+        c, r = (int(v) for v in name[3:-4].split("_"))
+        assert data == full_tiles["tx_%d_%d.png" % (c - 2, r)]
+    decoded = cv2.imread(str(region / "tx_3_0.png"), cv2.IMREAD_UNCHANGED)
+    assert decoded.shape == (32, 32, 3)
+
+def test_exif_orientation(tmp_path):
+    data = cv2.imencode(".jpg", np.zeros((8, 16, 3), dtype=np.uint8))[1].tobytes()
+    # Big-endian TIFF with a single IFD0 entry: Orientation (SHORT) = 6.
+    tiff = (b"MM\x00\x2a\x00\x00\x00\x08\x00\x01"
+            b"\x01\x12\x00\x03\x00\x00\x00\x01\x00\x06\x00\x00\x00\x00\x00\x00")
+    app1 = b"\xff\xe1" + (len(tiff) + 8).to_bytes(2, "big") + b"Exif\x00\x00" + tiff
+    path = tmp_path / "rotated.jpg"
+    path.write_bytes(data[:2] + app1 + data[2:])
+    assert headers.exif_orientation(str(path)) == 6
+    (tmp_path / "upright.jpg").write_bytes(data)
+    assert headers.exif_orientation(str(tmp_path / "upright.jpg")) == 1
+
+    # The transposed image is split as OpenCV decodes it.
+    assert split_image(str(path), 8, format="png", outdir=str(tmp_path / "out")) == 2
+    assert sorted(os.listdir(tmp_path / "out")) == ["tx_0_0.png", "tx_0_1.png"]
+
+class ArraySource:
+    """
+    A windowed source over an in-memory image, that records its reads.
+    """
+    windowed = True
+    channels = 3
+    itemsize = 1
+    compressed_bytes = 0
+
+    def __init__(self, image):
+        self.image = image
+        self.height, self.width = image.shape[:2]
+        self.reads = []
+
+    def read(self, x, y, w, h, m):
+        self.reads.append((x, y, w, h))
+        return self.image[y:y+h, x:x+w]
+
+def test_sharded_strips_cover_full_split(tmp_path, monkeypatch):
+    # Level 3 is a 16x8 grid of tiles, split here in strips of one tile row.
+    image = np.random.default_rng(3).integers(0, 256, size=(64, 128, 3), dtype=np.uint8)
+    source = str(tmp_path / "source.png")
+    cv2.imwrite(source, image)
+    full = tmp_path / "full"
+    assert split_image(source, 8, format="png", outdir=str(full)) == 128
+    expected = {name: (full / name).read_bytes() for name in os.listdir(full)}
+
+    budget = BASE_BYTES + 8 * 2 * 128 * 3 + 2 * 2 * 8 * 8 * 3
+    written = {}
+    for i in range(3):
+        array = ArraySource(image)
+        monkeypatch.setattr(split, "open_source", lambda filename, m, partial=False: array)
+        out = tmp_path / ("shard%d" % i)
+        count = split_image(source, 8, format="png", outdir=str(out), shard=(i, 3), max_memory=budget)
+        assert len(array.reads) > 1
+        names = os.listdir(out)
+        assert count == len(names)
+        assert not written.keys() & set(names)
+        written.update((name, (out / name).read_bytes()) for name in names)
+    assert written == expected
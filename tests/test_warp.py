@@ -0,0 +1,173 @@
+import numpy as np
+import pytest
+
+gdal = pytest.importorskip("osgeo.gdal")
+
+from vttools import tif, warp
+
+WGS84 = ('GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,298.257223563]],'
+         'PRIMEM["Greenwich",0],UNIT["degree",0.0174532925199433],AUTHORITY["EPSG","4326"]]')
+
+def geotiff(path, bands, alpha=False):
+    """
+    A 64x32 raster covering lon [0, 20], lat [0, 10] in EPSG:4326, with an
+    opaque left half and a transparent right half when alpha is set.
+    """
+    ds = gdal.GetDriverByName("GTiff").Create(str(path), 64, 32, bands, gdal.GDT_Byte)
+    ds.SetGeoTransform((0.0, 20.0 / 64, 0.0, 10.0, 0.0, -10.0 / 32))
+    ds.SetProjection(WGS84)
+    for b in range(1, bands + 1):
+        ds.GetRasterBand(b).WriteArray(np.full((32, 64), 50 * b, dtype=np.uint8))
+    if alpha:
+        band = ds.GetRasterBand(bands)
+        band.SetColorInterpretation(gdal.GCI_AlphaBand)
+        mask = np.zeros((32, 64), dtype=np.uint8)
+        mask[:, :32] = 255
+        band.WriteArray(mask)
+    ds.FlushCache()
+    return ds
+
+def test_warp_tile_rgba(tmp_path):
+    ds = geotiff(tmp_path / "rgba.tif", 4, alpha=True)
+    tile = tif.warp_tile(ds, 0.0, 0.0, 20.0, 10.0, 16, "near")
+    assert tile.shape == (16, 16, 4)
+    assert (tile[:, :8, 3] == 255).all()
+    assert (tile[:, 8:, 3] == 0).all()
+    assert (tile[:, :8, :3] == [50, 100, 150]).all()
+
+def test_warp_tile_rgb(tmp_path):
+    ds = geotiff(tmp_path / "rgb.tif", 3)
+    tile = tif.warp_tile(ds, 0.0, 0.0, 20.0, 10.0, 16, "near")
+    assert tile.shape == (16, 16, 3)
+    assert (tile == [50, 100, 150]).all()
+
+def test_warp_tile_not_covered(tmp_path):
+    ds = geotiff(tmp_path / "rgba.tif", 4, alpha=True)
+    assert tif.warp_tile(ds, 40.0, 0.0, 60.0, 10.0, 16, "near") is None
+    # Covered, but fully transparent.
+    assert tif.warp_tile(ds, 11.0, 0.0, 19.0, 10.0, 16, "near") is None
+
+def test_warp_tiles_invalid_input(tmp_path):
+    bad = tmp_path / "bad.tif"
+    bad.write_bytes(b"not a raster")
+    with pytest.raises(ValueError, match="cannot read"):
+        warp.warp_tiles(str(bad), 3, outdir=str(tmp_path / "out"))
+    plain = tmp_path / "plain.tif"
+    gdal.GetDriverByName("GTiff").Create(str(plain), 16, 16, 3, gdal.GDT_Byte).FlushCache()
+    with pytest.raises(ValueError, match="no projection"):
+        warp.warp_tiles(str(plain), 3, outdir=str(tmp_path / "out"))
+
+def raster(path, options, dtype=np.uint16, gdt=None, xsize=40, ysize=36, bands=3):
+    """
+    A GeoTIFF of random data written with the given creation options, whose
+    size is not a multiple of the block size.
+    """
+    data = np.random.default_rng(xsize).integers(0, 250, size=(ysize, xsize, bands)).astype(dtype)
+    gdt = gdt if gdt is not None else gdal.GDT_UInt16
+    ds = gdal.GetDriverByName("GTiff").Create(str(path), xsize, ysize, bands, gdt, options=options)
+    ds.SetGeoTransform((0.0, 0.5, 0.0, 10.0, 0.0, -0.5))
+    ds.SetProjection(WGS84)
+    for b in range(bands):
+        ds.GetRasterBand(b + 1).WriteArray(data[:, :, b])
+    ds = None
+    return data
+
+def check_blocks(path, data, block, rows_per_block=None, gain=None):
+    bx, by = block
+    image = np.zeros(data.shape, dtype=np.float32 if gain is not None else data.dtype)
+    offsets = []
+    for xoff, yoff, window in tif.iter_blocks(str(path), gain is not None, rows_per_block):
+        assert xoff % bx == 0 and yoff % by == 0
+        assert window.shape == (min(by, data.shape[0] - yoff), min(bx, data.shape[1] - xoff), data.shape[2])
+        assert window.dtype == image.dtype
+        image[yoff:yoff + window.shape[0], xoff:xoff + window.shape[1]] = window
+        offsets.append((xoff, yoff))
+    expected = data if gain is None else data.astype(np.float32) * np.asarray(gain, dtype=np.float32)
+    assert (image == expected).all()
+    return offsets
+
+def test_iter_blocks_striped(tmp_path):
+    path = tmp_path / "striped.tif"
+    data = raster(path, ["BLOCKYSIZE=4"])
+    assert tif.block_size(gdal.Open(str(path))) == (40, 4)
+    assert check_blocks(path, data, (40, 4)) == [(0, y) for y in range(0, 36, 4)]
+    # Rounded up to a multiple of the strip height.
+    assert check_blocks(path, data, (40, 12), rows_per_block=10) == [(0, 0), (0, 12), (0, 24)]
+
+def test_iter_blocks_tiled(tmp_path):
+    path = tmp_path / "tiled.tif"
+    data = raster(path, ["TILED=YES", "BLOCKXSIZE=16", "BLOCKYSIZE=16"])
+    assert tif.block_size(gdal.Open(str(path))) == (16, 16)
+    assert check_blocks(path, data, (16, 16)) == [(x, y) for y in (0, 16, 32) for x in (0, 16, 32)]
+    assert check_blocks(path, data, (16, 32), rows_per_block=20) == [(x, y) for y in (0, 32) for x in (0, 16, 32)]
+
+def test_iter_blocks_gain(tmp_path):
+    path = tmp_path / "gain.tif"
+    data = raster(path, ["BLOCKYSIZE=8"])
+    (tmp_path / "gain.tif.txt").write_text("GAIN_BAND1 0.5\nGAIN_BAND2 2.0\nGAIN_BAND3 0.25\n")
+    check_blocks(path, data, (40, 8), gain=[0.5, 2.0, 0.25])
+    image, _ = tif.tif2array_native(str(path))
+    assert image.dtype == np.uint16 and (image == data).all()
+    image, _ = tif.tif2array_native(str(path), calc_gain=True)
+    assert image.dtype == np.float32
+    assert (image == data.astype(np.float32) * np.float32([0.5, 2.0, 0.25])).all()
+    (tmp_path / "gain.tif.txt").write_text("GAIN_BAND1 0.5\n")
+    with pytest.raises(ValueError):
+        next(tif.iter_blocks(str(path), calc_gain=True))
+
+class DriverSpy:
+    """
+    Records the creation options of CreateCopy() calls.
+    """
+    def __init__(self, driver, calls):
+        self.driver = driver
+        self.calls = calls
+
+    def CreateCopy(self, *args, options=()):
+        self.calls.append(list(options))
+        return self.driver.CreateCopy(*args, options=options)
+
+    def __getattr__(self, name):
+        return getattr(self.driver, name)
+
+def write_cog(tmp_path, name, compress, quality, monkeypatch):
+    source = tmp_path / "source.tif"
+    data = raster(source, ["TILED=YES"], dtype=np.uint8, gdt=gdal.GDT_Byte, xsize=512, ysize=512)
+    calls = []
+    get_driver = gdal.GetDriverByName
+    monkeypatch.setattr(gdal, "GetDriverByName", lambda n: DriverSpy(get_driver(n), calls))
+    out = tmp_path / name
+    with tif.COGWriter(str(out), 512, 512, 3, np.uint8, dataset=gdal.Open(str(source)),
+                       compress=compress, quality=quality, blocksize=128) as w:
+        w.write_blocks(tif.iter_blocks(str(source)))
+    monkeypatch.undo()
+    assert not (tmp_path / (name + ".tmp.tif")).exists()
+    return data, out, calls
+
+def test_cog_round_trip(tmp_path, monkeypatch):
+    data, out, calls = write_cog(tmp_path, "deflate.tif", "DEFLATE", 9, monkeypatch)
+    assert "LEVEL=9" in calls[-1] and "COMPRESS=DEFLATE" in calls[-1]
+    ds = gdal.Open(str(out))
+    assert ds.GetMetadataItem("LAYOUT", "IMAGE_STRUCTURE") == "COG"
+    assert ds.GetMetadataItem("COMPRESSION", "IMAGE_STRUCTURE") == "DEFLATE"
+    band = ds.GetRasterBand(1)
+    assert band.GetBlockSize() == [128, 128]
+    assert [band.GetOverview(i).XSize for i in range(band.GetOverviewCount())] == [256, 128, 64]
+    assert ds.GetGeoTransform() == (0.0, 0.5, 0.0, 10.0, 0.0, -0.5)
+    assert ds.GetSpatialRef().GetAuthorityCode(None) == "4326"
+    assert (tif.read_window(ds, 0, 0, 512, 512) == data).all()
+
+def test_cog_jpeg_quality(tmp_path, monkeypatch):
+    _, low, calls = write_cog(tmp_path, "low.tif", "JPEG", 10, monkeypatch)
+    assert "QUALITY=10" in calls[-1] and not any(o.startswith("LEVEL=") for o in calls[-1])
+    _, high, _ = write_cog(tmp_path, "high.tif", "JPEG", 95, monkeypatch)
+    assert gdal.Open(str(low)).GetMetadataItem("COMPRESSION", "IMAGE_STRUCTURE").endswith("JPEG")
+    assert low.stat().st_size < high.stat().st_size
+
+@pytest.mark.parametrize("compress, quality, dtype", [
+    ("LZW", 5, np.uint8), ("NONE", 5, np.uint8), ("WEBP", None, np.uint8), ("JPEG", 90, np.uint16)])
+def test_cog_invalid_options(tmp_path, compress, quality, dtype):
+    out = tmp_path / "out.tif"
+    with pytest.raises(ValueError):
+        tif.COGWriter(str(out), 64, 64, 3, dtype, compress=compress, quality=quality)
+    assert not (tmp_path / "out.tif.tmp.tif").exists()
@@ -14,40 +14,7 @@ import argparse
 import math
 import sys
 import json
-from geopy.geocoders import Nominatim
-
-def get_lat_lon(location_name):
-    geolocator = Nominatim(user_agent="geoapi")
-    location = geolocator.geocode(location_name)
-    if location:
-        return (location.latitude, location.longitude)
-    else:
-        return None
-
-def uvToLatLon(u, v):
-    lon = u * 360.0 - 180.0
-    lat = v * 180.0 - 90.0
-    return lon, lat
-
-def latLonToUV(lat, lon):
-    u = (lon + 180.0) / 360.0
-    v = (lat + 90.0) / 180.0
-    return u, v
-
-def colRowToUV(c, r, nc, nr):
-    u = c / nc
-    v = 1.0 - (r / nr)
-    return u, v
-
-def tileExtent(col, row, nc, nr):
-    u0, v0 = colRowToUV(col, row, nc, nr)
-    u1, v1 = colRowToUV(col + 1, row + 1, nc, nr)
-    lon0, lat0 = uvToLatLon(u0, v0)
-    lon1, lat1 = uvToLatLon(u1, v1)
-    return (lon0, lat0, lon1, lat1), (u0, v0, u1, v1)
-
-def extent(a, b):
-    return [abs(b[0] - a[0]), abs(b[1] - a[1])]
+from vttools.tiles import tileExtent, extent, get_lat_lon, tile_for_latlon
 
 def parse_args():
     # Argument parsing
@@ -102,12 +69,7 @@ if __name__ == "__main__":
             print("Latitude must be in [-90, 90], longitude in [-180, 180]")
             sys.exit(1)
 
-        u, v = latLonToUV(lat, lon)
-        c = u * nc
-        r = (1.0 - v) * nr
-
-        col = int(math.floor(c))
-        row = int(math.floor(r))
+        col, row = tile_for_latlon(lat, lon, l)
 
     elif args.column is not None and args.row is not None:
         col = args.column
@@ -0,0 +1,109 @@
+#! /usr/bin/env python
+
+"""
+This script verifies the 'levelLL' directories of a tile pyramid,
+produced by generate-lod.py or sentinel-query.py, by reading only the
+headers and end markers of the tiles.
+"""
+
+import argparse
+import os
+import sys
+
+from vttools import metrics
+from vttools.verify import ok, verify_pyramid
+
+
+"""
+Parses a comma-separated list of levels, or ranges like 3-7.
+"""
+def levels_list(x):
+    levels = []
+    try:
+        for part in x.split(','):
+            if '-' in part:
+                a, b = part.split('-')
+                levels.extend(range(int(a), int(b) + 1))
+            else:
+                levels.append(int(part))
+    except ValueError:
+        raise argparse.ArgumentTypeError("%r is not a list of levels, e.g. 0-5,8" % x)
+    return levels
+
+"""
+Parses a LEVEL,COL,ROW tile.
+"""
+def tile_triplet(x):
+    try:
+        level, col, row = (int(v) for v in x.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError("%r is not of the form LEVEL,COL,ROW" % x)
+    return level, col, row
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Verify the levelLL directories of a tile pyramid, reading only the JPG/PNG headers and end markers. Reports missing, duplicate, mis-sized and corrupt tiles per level.')
+    parser.add_argument('DIRECTORY', type=str,
+                        help='Directory containing the levelLL directories.')
+    parser.add_argument('-l', '--levels', type=levels_list, default=None,
+                        help='Levels to verify, e.g. 0-5,8. Defaults to all the level directories found.')
+    parser.add_argument('-s', '--tilesize', type=int, default=None,
+                        help='Expected tile size in pixels. Defaults to the most common size in each level.')
+    parser.add_argument('--root', type=tile_triplet, default=None, metavar='LEVEL,COL,ROW',
+                        help='Only expect the tiles in the subtree of this tile, e.g. for a sentinel-query.py multi mode download.')
+    parser.add_argument('-w', '--skip-water', default=False, action='store_true',
+                        help='Do not expect the all-water tiles, which sentinel-query.py skips by default.')
+    parser.add_argument('-j', '--workers', type=int, default=16,
+                        help='Number of threads reading the files. Defaults to 16.')
+    parser.add_argument('--list-missing', type=str, default=None, metavar='FILE',
+                        help='Write the missing, corrupt and mis-sized tiles to FILE, one "level col row" per line, to re-fetch them with sentinel-query.py --tiles FILE.')
+    parser.add_argument('-v', '--verbose', default=False, action='store_true',
+                        help='Print every problem, not just the counts.')
+    metrics.add_arguments(parser)
+    return parser.parse_args()
+
+def tile_of(name):
+    tokens = os.path.splitext(name)[0].split('_')
+    return int(tokens[1]), int(tokens[2])
+
+if __name__ == "__main__":
+    args = parse_args()
+    m = metrics.from_args(args, label="verify")
+
+    reports = verify_pyramid(args.DIRECTORY, args.levels, args.tilesize, args.root,
+                             args.skip_water, args.workers, metrics=m)
+    m.close()
+
+    if not reports:
+        print(f"No level directories found in {args.DIRECTORY}")
+        sys.exit(1)
+
+    refetch = []
+    for r in reports:
+        size = f"{r.tilesize[0]}x{r.tilesize[1]}" if r.tilesize else "-"
+        status = "OK" if ok(r) else "FAIL"
+        print(f"Level {r.level:02d}: {status:4s} {r.found}/{r.expected} tiles, size {size}, "
+              f"{len(r.missing)} missing, {len(r.duplicates)} duplicate, "
+              f"{len(r.missized)} mis-sized, {len(r.corrupt)} corrupt, {len(r.unexpected)} unexpected")
+        if args.verbose:
+            for c, row in r.missing:
+                print(f"  missing     tx_{c}_{row}")
+            for c, row, names in r.duplicates:
+                print(f"  duplicate   {', '.join(names)}")
+            for name, w, h in r.missized:
+                print(f"  mis-sized   {name} ({w}x{h})")
+            for name, problem in r.corrupt:
+                print(f"  corrupt     {name} ({problem})")
+            for name in r.unexpected:
+                print(f"  unexpected  {name}")
+        bad = set(r.missing)
+        bad.update(tile_of(name) for name, _, _ in r.missized)
+        bad.update(tile_of(name) for name, _ in r.corrupt)
+        refetch.extend((r.level, c, row) for c, row in sorted(bad, key=lambda cr: (cr[1], cr[0])))
+
+    if args.list_missing is not None:
+        with open(args.list_missing, "w") as f:
+            for level, c, row in refetch:
+                f.write(f"{level} {c} {row}\n")
+        print(f"Wrote {len(refetch)} tiles to re-fetch to {args.list_missing}")
+
+    sys.exit(0 if all(ok(r) for r in reports) else 1)
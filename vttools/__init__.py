@@ -0,0 +1,44 @@
+"""
+Tools to prepare Sparse Virtual Texture (SVT) datasets.
+
+The main entry points are re-exported here and resolved lazily, so that
+importing the package (or the pure tile math in vttools.tiles) does not pull
+in OpenCV, GDAL, sentinelhub or geopy:
+
+    import vttools
+    vttools.split_image("image.jpg", 1024)
+    vttools.build_pyramid(3, "level03")
+    vttools.download_tiles(41.38, 2.17, 7, 11, date_from, date_to)
+    vttools.tile_for_latlon(41.38, 2.17, 9)
+"""
+
+import importlib
+
+_exports = {
+    "split_image": "vttools.split",
+    "build_pyramid": "vttools.lod",
+    "download_tile": "vttools.sentinel",
+    "download_tiles": "vttools.sentinel",
+    "download_level": "vttools.sentinel",
+    "warp_tiles": "vttools.warp",
+    "verify_pyramid": "vttools.verify",
+    "tile_for_latlon": "vttools.tiles",
+    "tileExtent": "vttools.tiles",
+    "tiles_in_bbox": "vttools.tiles",
+    "level_shape": "vttools.tiles",
+    "Metrics": "vttools.metrics",
+    "Encoder": "vttools.encoders",
+}
+
+__all__ = sorted(_exports)
+
+def __getattr__(name):
+    module = _exports.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,29 @@
+"""
+Argument checks shared by the command-line scripts.
+"""
+
+import argparse
+import os.path
+
+"""
+Checks a JPG quality integer parameter.
+"""
+def quality_int(x):
+    try: 
+        x = int(x)
+    except ValueError:
+        raise argparse.ArgumentTypeError("%r not an integer" % x)
+
+    if x <= 0 or x > 100:
+        raise argparse.ArgumentTypeError("%r not in range [1, 100]" % x)
+
+    return x
+
+"""
+Checks a file parameter.
+"""
+def is_valid_file(parser, arg):
+    if not os.path.exists(arg):
+        parser.error("The file %s does not exist!" % arg)
+    else:
+        return arg  # return the string
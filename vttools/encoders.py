@@ -0,0 +1,220 @@
+"""
+Tile encoders. An Encoder holds the output format, the backend that encodes
+it (OpenCV or Pillow) and the tuning options of the format, so that the tools
+pass a single value around, also to worker processes.
+
+Usage:
+    encoders.add_arguments(parser)
+    ...
+    encoder = encoders.from_args(args)
+    data = encoder.encode(tile)  # BGR(A) or grayscale array
+"""
+
+import argparse
+import io
+
+import numpy as np
+
+from vttools import imaging
+from vttools.cli import quality_int
+
+FORMATS = ("jpg", "png", "webp", "avif")
+BACKENDS = ("cv2", "pil")
+
+""" Pillow format names """
+PIL_FORMATS = {"jpg": "JPEG", "png": "PNG", "webp": "WEBP", "avif": "AVIF"}
+
+def int_range(lo, hi):
+    """
+    Argument type for an integer in [lo, hi].
+    """
+    def check(x):
+        try:
+            v = int(x)
+        except ValueError:
+            raise argparse.ArgumentTypeError("%r not an integer" % x)
+        if not lo <= v <= hi:
+            raise argparse.ArgumentTypeError("%r not in range [%d, %d]" % (x, lo, hi))
+        return v
+    return check
+
+def add_arguments(parser, quality=95, backend="cv2", short=True):
+    """
+    Adds the output format, quality, encoder backend and per-format tuning
+    options to an argparse parser. With short, the format and quality also
+    get the -f and -q flags.
+    """
+    group = parser.add_argument_group('encoding')
+    group.add_argument(*(('-f', '--format') if short else ('--format',)), type=str, choices=FORMATS, default='jpg',
+                       help='Defines the format of the output images. Defaults to jpg.')
+    group.add_argument(*(('-q', '--quality') if short else ('--quality',)), type=quality_int, default=quality,
+                       help='If the format is JPG, WEBP or AVIF, this defines the quality setting in [1,100]. Defaults to %d.' % quality)
+    group.add_argument('--encoder', dest='backend', type=str, choices=BACKENDS, default=backend,
+                       help='Library that encodes the tiles, OpenCV or Pillow. Defaults to %s.' % backend)
+    group.add_argument('--progressive', default=False, action='store_true',
+                       help='JPG: write progressive JPEGs, which show a coarse version of the tile before the whole of it is loaded.')
+    group.add_argument('--optimize', default=False, action='store_true',
+                       help='JPG: compute optimal Huffman tables, for smaller files at a small encoding cost.')
+    group.add_argument('--png-compression', type=int_range(0, 9), default=None, metavar='[0-9]',
+                       help='PNG: zlib compression level, from 0 (fastest) to 9 (smallest). Defaults to the default of the backend.')
+    group.add_argument('--lossless', default=False, action='store_true',
+                       help='WEBP: encode losslessly. The quality then trades speed for size.')
+    group.add_argument('--webp-method', type=int_range(0, 6), default=None, metavar='[0-6]',
+                       help='WEBP: encoding effort, from 0 (fastest) to 6 (smallest). Only with --encoder pil.')
+    group.add_argument('--avif-speed', type=int_range(0, 10), default=None, metavar='[0-10]',
+                       help='AVIF: encoding speed, from 0 (slowest, smallest) to 10 (fastest).')
+
+def from_args(args):
+    """
+    Creates an Encoder from the options of add_arguments(), and checks that
+    the backend can encode the format.
+    raises:
+        ValueError : if the options do not apply to the backend, or it cannot
+                     encode the format.
+    """
+    encoder = Encoder(args.format, args.quality, args.backend, progressive=args.progressive,
+                      optimize=args.optimize, png_compression=args.png_compression,
+                      lossless=args.lossless, webp_method=args.webp_method, avif_speed=args.avif_speed)
+    encoder.probe()
+    return encoder
+
+def get(encoder=None, format="jpg", quality=95):
+    """
+    The given encoder, or the default one for format and quality.
+    """
+    return encoder if encoder is not None else Encoder(format, quality)
+
+class Encoder:
+    """
+    Encodes tiles into one of FORMATS with the OpenCV or the Pillow backend.
+    Options that do not apply to the format are ignored.
+    Inputs:
+        format (str) : output format, also the file extension.
+        quality (int) : JPG, WEBP and AVIF quality in [1, 100].
+        backend (str) : 'cv2' or 'pil'.
+        progressive, optimize (bool) : JPG progressive mode and optimal Huffman tables.
+        png_compression (int) : PNG zlib level in [0, 9], or None for the backend default.
+        lossless (bool) : lossless WEBP.
+        webp_method (int) : WEBP effort in [0, 6], or None for the default. Pillow only.
+        avif_speed (int) : AVIF speed in [0, 10], or None for the default.
+    raises:
+        ValueError : on an unknown format or backend, or options the backend does not support.
+    """
+
+    def __init__(self, format="jpg", quality=95, backend="cv2", progressive=False, optimize=False,
+                 png_compression=None, lossless=False, webp_method=None, avif_speed=None):
+        if format not in FORMATS:
+            raise ValueError("unknown format %r, use one of %s" % (format, ", ".join(FORMATS)))
+        if backend not in BACKENDS:
+            raise ValueError("unknown encoder %r, use one of %s" % (backend, ", ".join(BACKENDS)))
+        if format == "webp" and webp_method is not None and backend != "pil":
+            raise ValueError("the WEBP method is only supported by the pil encoder")
+        self.format = format
+        self.quality = quality
+        self.backend = backend
+        self.progressive = progressive
+        self.optimize = optimize
+        self.png_compression = png_compression
+        self.lossless = lossless
+        self.webp_method = webp_method
+        self.avif_speed = avif_speed
+
+    def __repr__(self):
+        return "Encoder(%s)" % ", ".join("%s=%r" % kv for kv in vars(self).items())
+
+    def cv2_params(self):
+        cv = imaging.cv2()
+        if self.format == "jpg":
+            return [int(cv.IMWRITE_JPEG_QUALITY), self.quality,
+                    int(cv.IMWRITE_JPEG_PROGRESSIVE), int(self.progressive),
+                    int(cv.IMWRITE_JPEG_OPTIMIZE), int(self.optimize)]
+        if self.format == "png":
+            if self.png_compression is None:
+                return []
+            return [int(cv.IMWRITE_PNG_COMPRESSION), self.png_compression]
+        if self.format == "webp":
+            if not self.lossless:
+                return [int(cv.IMWRITE_WEBP_QUALITY), self.quality]
+            if hasattr(cv, "IMWRITE_WEBP_LOSSLESS_MODE"):
+                return [int(cv.IMWRITE_WEBP_QUALITY), self.quality,
+                        int(cv.IMWRITE_WEBP_LOSSLESS_MODE), int(cv.IMWRITE_WEBP_LOSSLESS_ON)]
+            # Older OpenCV versions encode losslessly above 100.
+            return [int(cv.IMWRITE_WEBP_QUALITY), 101]
+        params = [int(cv.IMWRITE_AVIF_QUALITY), self.quality]
+        if self.avif_speed is not None:
+            params += [int(cv.IMWRITE_AVIF_SPEED), self.avif_speed]
+        return params
+
+    def pil_params(self):
+        if self.format == "jpg":
+            return dict(quality=self.quality, progressive=self.progressive, optimize=self.optimize)
+        if self.format == "png":
+            return {} if self.png_compression is None else dict(compress_level=self.png_compression)
+        if self.format == "webp":
+            params = dict(quality=self.quality, lossless=self.lossless)
+            if self.webp_method is not None:
+                params["method"] = self.webp_method
+            return params
+        params = dict(quality=self.quality)
+        if self.avif_speed is not None:
+            params["speed"] = self.avif_speed
+        return params
+
+    def encode(self, tile):
+        """
+        Encodes a BGR(A) or grayscale tile.
+        return:
+            bytes-like : the encoded file.
+        raises:
+            ValueError : if the backend cannot encode the tile.
+        """
+        if self.backend == "cv2":
+            cv = imaging.cv2()
+            try:
+                ok, buf = cv.imencode("." + self.format, tile, self.cv2_params())
+            except (cv.error, AttributeError) as e:
+                # Older versions lack the IMWRITE_AVIF_* constants.
+                raise ValueError("OpenCV cannot encode %s: %s" % (self.format.upper(), e))
+            if not ok:
+                raise ValueError("OpenCV cannot encode %s" % self.format.upper())
+            return buf.reshape(-1).data
+        from PIL import Image
+        if self.format == "jpg" and tile.ndim == 3 and tile.shape[2] == 4:
+            # JPEG has no alpha, OpenCV drops it too.
+            tile = tile[:, :, :3]
+        try:
+            # The swap is symmetric, so this gives RGB(A) for Pillow.
+            im = Image.fromarray(imaging.rgb_to_bgr(tile))
+            out = io.BytesIO()
+            im.save(out, format=PIL_FORMATS[self.format], **self.pil_params())
+        except (OSError, KeyError, TypeError) as e:
+            raise ValueError("Pillow cannot encode %s: %s" % (self.format.upper(), e))
+        return out.getbuffer()
+
+    def probe(self):
+        """
+        Encodes a small tile, to fail before a run if the backend was built
+        without the format.
+        raises:
+            ValueError : if the backend cannot encode the format.
+        """
+        self.encode(np.zeros((16, 16, 3), dtype=np.uint8))
+
+def decode(data, backend="cv2"):
+    """
+    Decodes an encoded tile with the given backend into a BGR(A) or grayscale array.
+    raises:
+        ValueError : if the data cannot be decoded.
+    """
+    if backend == "cv2":
+        cv = imaging.cv2()
+        im = cv.imdecode(np.frombuffer(data, dtype=np.uint8), cv.IMREAD_UNCHANGED)
+        if im is None:
+            raise ValueError("OpenCV cannot decode the image")
+        return im
+    from PIL import Image
+    try:
+        with Image.open(io.BytesIO(data)) as im:
+            return imaging.rgb_to_bgr(np.asarray(im))
+    except OSError as e:
+        raise ValueError("Pillow cannot decode the image: %s" % e)
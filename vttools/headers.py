@@ -0,0 +1,282 @@
+"""
+Reads image dimensions from the JPEG, PNG, WebP and AVIF headers, and checks
+their end markers (or container sizes), without decoding.
+"""
+
+import struct
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+""" Samples per pixel of each PNG color type """
+PNG_CHANNELS = {0: 1, 2: 3, 3: 3, 4: 2, 6: 4}
+
+""" JPEG start-of-frame markers (all but DHT, JPG and DAC in C0-CF) """
+JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+def png_size(f):
+    """
+    (width, height, channels, bits) from an open PNG file, or None.
+    """
+    head = f.read(26)
+    if len(head) < 26 or head[:8] != PNG_SIGNATURE or head[12:16] != b"IHDR":
+        return None
+    width, height, bits, color = struct.unpack(">IIBB", head[16:26])
+    return width, height, PNG_CHANNELS.get(color, 0), bits
+
+def jpeg_size(f):
+    """
+    (width, height, channels, bits) from an open JPEG file, or None.
+    """
+    if f.read(2) != b"\xff\xd8":
+        return None
+    while True:
+        b = f.read(1)
+        while b == b"\xff":
+            b = f.read(1)
+        if not b:
+            return None
+        marker = b[0]
+        if marker == 0xD9 or marker == 0xDA:
+            # End of image or start of scan before any frame header.
+            return None
+        if 0xD0 <= marker <= 0xD7 or marker == 0x01:
+            continue
+        length = f.read(2)
+        if len(length) < 2:
+            return None
+        length = struct.unpack(">H", length)[0]
+        if marker in JPEG_SOF:
+            sof = f.read(6)
+            if len(sof) < 6:
+                return None
+            bits, height, width, channels = struct.unpack(">BHHB", sof)
+            return width, height, channels, bits
+        f.seek(length - 2, 1)
+
+def webp_size(f):
+    """
+    (width, height, channels, bits) from an open WebP file, or None.
+    """
+    head = f.read(30)
+    if len(head) < 30 or head[:4] != b"RIFF" or head[8:12] != b"WEBP":
+        return None
+    chunk = head[12:16]
+    if chunk == b"VP8 ":
+        # Frame tag (3 bytes), start code, then 14-bit dimensions.
+        if head[23:26] != b"\x9d\x01\x2a":
+            return None
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF, 3, 8
+    if chunk == b"VP8L":
+        if head[20] != 0x2F:
+            return None
+        bits = struct.unpack("<I", head[21:25])[0]
+        alpha = (bits >> 28) & 1
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1, 3 + alpha, 8
+    if chunk == b"VP8X":
+        alpha = 1 if head[20] & 0x10 else 0
+        width = int.from_bytes(head[24:27], "little") + 1
+        height = int.from_bytes(head[27:30], "little") + 1
+        return width, height, 3 + alpha, 8
+    return None
+
+""" ISOBMFF boxes that contain other boxes, down to the image properties """
+AVIF_CONTAINERS = {b"meta": 4, b"iprp": 0, b"ipco": 0}
+
+def iter_boxes(data, start=0, end=None):
+    """
+    (type, payload start, box end) of the ISOBMFF boxes in data[start:end].
+    """
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                return
+            size = struct.unpack(">Q", data[pos + 8:pos + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        yield kind, pos + header, pos + size
+        pos += size
+
+def avif_size(f):
+    """
+    (width, height, channels, bits) from an open AVIF file, or None. The
+    dimensions come from the first 'ispe' property, and the bit depth and
+    channels from the first 'pixi' one, plus one channel with an alpha
+    auxiliary image.
+    """
+    head = f.read(12)
+    if len(head) < 12 or head[4:8] != b"ftyp":
+        return None
+    f.seek(0)
+    # The metadata is at the start, before the image data.
+    data = f.read(64 * 1024)
+    found = {}
+
+    def walk(start, end):
+        for kind, payload, box_end in iter_boxes(data, start, min(end, len(data))):
+            if kind in AVIF_CONTAINERS:
+                walk(payload + AVIF_CONTAINERS[kind], box_end)
+            elif kind == b"ispe" and "ispe" not in found and payload + 12 <= len(data):
+                found["ispe"] = struct.unpack(">II", data[payload + 4:payload + 12])
+            elif kind == b"pixi" and "pixi" not in found and payload + 6 <= len(data):
+                found["pixi"] = data[payload + 4], data[payload + 5]
+            elif kind == b"auxC" and b"alpha" in data[payload:box_end]:
+                found["alpha"] = True
+
+    walk(0, len(data))
+    if "ispe" not in found:
+        return None
+    width, height = found["ispe"]
+    channels, bits = found.get("pixi", (3, 8))
+    return width, height, channels + (1 if "alpha" in found else 0), bits
+
+def detect(f):
+    """
+    Format of an open image file from its magic bytes, one of 'jpg', 'png',
+    'webp' and 'avif', or None.
+    """
+    magic = f.read(12)
+    f.seek(0)
+    if magic[:2] == b"\xff\xd8":
+        return "jpg"
+    if magic[:2] == PNG_SIGNATURE[:2]:
+        return "png"
+    if magic[:4] == b"RIFF" and magic[8:12] == b"WEBP":
+        return "webp"
+    if magic[4:8] == b"ftyp" and magic[8:12] in (b"avif", b"avis"):
+        return "avif"
+    return None
+
+SIZE_READERS = {"jpg": jpeg_size, "png": png_size, "webp": webp_size, "avif": avif_size}
+
+def image_size(filename):
+    """
+    (width, height, channels, bits) of a JPEG, PNG, WebP or AVIF file, or
+    None for other formats and unreadable headers.
+    """
+    with open(filename, "rb") as f:
+        fmt = detect(f)
+        if fmt is not None:
+            return SIZE_READERS[fmt](f)
+    return None
+
+def tiff_orientation(data):
+    """
+    Orientation tag (0x0112) of the first IFD of TIFF-structured EXIF data, or 1.
+    """
+    if len(data) < 8 or data[:2] not in (b"II", b"MM"):
+        return 1
+    order = "<" if data[:2] == b"II" else ">"
+    ifd = struct.unpack(order + "I", data[4:8])[0]
+    if ifd + 2 > len(data):
+        return 1
+    count = struct.unpack(order + "H", data[ifd:ifd + 2])[0]
+    for i in range(count):
+        entry = ifd + 2 + 12 * i
+        if entry + 12 > len(data):
+            break
+        tag, kind = struct.unpack(order + "HH", data[entry:entry + 4])
+        if tag == 0x0112 and kind == 3:
+            return struct.unpack(order + "H", data[entry + 8:entry + 10])[0]
+    return 1
+
+def exif_orientation(filename):
+    """
+    EXIF orientation of a JPEG (APP1 segment) or PNG (eXIf chunk) file, in
+    [1, 8], where 1 is upright and 5 to 8 swap the width and height. 1 for
+    files without it.
+    """
+    with open(filename, "rb") as f:
+        fmt = detect(f)
+        if fmt == "jpg":
+            f.seek(2)
+            while True:
+                marker = f.read(4)
+                if len(marker) < 4 or marker[0] != 0xFF or marker[1] in (0xD9, 0xDA):
+                    return 1
+                length = struct.unpack(">H", marker[2:])[0]
+                if marker[1] == 0xE1:
+                    segment = f.read(length - 2)
+                    if segment[:6] == b"Exif\x00\x00":
+                        return tiff_orientation(segment[6:])
+                else:
+                    f.seek(length - 2, 1)
+        if fmt == "png":
+            f.seek(8)
+            while True:
+                head = f.read(8)
+                if len(head) < 8:
+                    return 1
+                length, kind = struct.unpack(">I4s", head)
+                if kind == b"eXIf":
+                    return tiff_orientation(f.read(length))
+                if kind in (b"IDAT", b"IEND"):
+                    return 1
+                f.seek(length + 4, 1)
+    return 1
+
+PNG_IEND = b"\x00\x00\x00\x00IEND\xaeB`\x82"
+
+def has_end_marker(f, fmt):
+    """
+    Whether an open JPEG or PNG file ends with its end marker, i.e. is not
+    truncated. Trailing zero padding after a JPEG EOI is accepted. WebP and
+    AVIF files have no end marker, so their container must be as long as its
+    RIFF size or its top-level boxes say.
+    """
+    f.seek(0, 2)
+    size = f.tell()
+    if fmt == "webp":
+        f.seek(4)
+        return size >= struct.unpack("<I", f.read(4))[0] + 8
+    if fmt == "avif":
+        f.seek(0)
+        pos = 0
+        while pos < size:
+            f.seek(pos)
+            header = f.read(16)
+            if len(header) < 8:
+                return False
+            box = struct.unpack(">I", header[:4])[0]
+            if box == 0:
+                return True
+            if box == 1:
+                if len(header) < 16:
+                    return False
+                box = struct.unpack(">Q", header[8:16])[0]
+            if box < 8:
+                return False
+            pos += box
+        return pos == size
+    tail = min(size, 1024)
+    f.seek(size - tail)
+    data = f.read(tail)
+    if fmt == "png":
+        return data.endswith(PNG_IEND)
+    return data.rstrip(b"\x00").endswith(b"\xff\xd9")
+
+def inspect(filename):
+    """
+    Reads the header and the end marker of a JPEG, PNG, WebP or AVIF file.
+    return:
+        (width, height, channels, complete) : complete is False if the end
+                                              marker is missing.
+    raises:
+        ValueError : if the file is not a JPEG, PNG, WebP or AVIF, or its
+                     header is corrupt.
+    """
+    with open(filename, "rb") as f:
+        fmt = detect(f)
+        if fmt is None:
+            raise ValueError("not a JPEG, PNG, WebP or AVIF file")
+        size = SIZE_READERS[fmt](f)
+        if size is None:
+            raise ValueError("corrupt %s header" % fmt.upper())
+        return size[0], size[1], size[2], has_end_marker(f, fmt)
@@ -0,0 +1,63 @@
+"""
+Image decoding and encoding helpers shared by the tile tools. OpenCV is
+imported on first use.
+"""
+
+import os
+
+import numpy as np
+
+_cv2 = None
+
+def cv2():
+    """
+    Imports OpenCV once, allowing images larger than its default limit.
+    """
+    global _cv2
+    if _cv2 is None:
+        # This is so that OpenCV supports images larger than 2^30 pixels (32768^2).
+        # 2^40 supports 1048576x1048576 images.
+        os.environ.setdefault("OPENCV_IO_MAX_IMAGE_PIXELS", pow(2, 40).__str__())
+        import cv2 as _module
+        _cv2 = _module
+    return _cv2
+
+def load_image(filename, m):
+    """
+    Reads and decodes an image file into a BGR array, timing both stages.
+    """
+    cv = cv2()
+    with m.stage("read"):
+        data = np.fromfile(filename, dtype=np.uint8)
+    m.add_bytes("read", data.size)
+    with m.stage("decode"):
+        im = cv.imdecode(data, cv.IMREAD_COLOR)
+    if im is None:
+        raise ValueError("Could not decode image: %s" % filename)
+    return im
+
+def rgb_to_bgr(im):
+    """
+    Reorders the bands of an RGB(A) array for OpenCV.
+    """
+    if im.ndim == 3 and im.shape[2] == 3:
+        return np.ascontiguousarray(im[:, :, 2::-1])
+    if im.ndim == 3 and im.shape[2] == 4:
+        return np.ascontiguousarray(im[:, :, [2, 1, 0, 3]])
+    return im
+
+def save_tile(filename, tile, encoder, m):
+    """
+    Encodes and writes a tile with the given Encoder, timing both stages.
+    Returns the bytes written.
+    """
+    with m.stage("encode"):
+        try:
+            data = encoder.encode(tile)
+        except ValueError as e:
+            raise ValueError("Could not encode %s: %s" % (filename, e))
+    with m.stage("write"):
+        with open(filename, "wb") as f:
+            f.write(data)
+    m.add_bytes("written", len(data))
+    return len(data)
@@ -0,0 +1,160 @@
+"""
+Generates the upper LOD levels from the tiles of a level previously split
+(with split-tiles.py). Each level L is put in the 'levelLL' directory.
+"""
+
+import os
+import re
+
+import numpy as np
+
+from vttools import encoders, imaging, shard as sharding
+from vttools.metrics import Metrics
+
+"""
+Processes the tiles of the given level, and produces the tiles of level-1,
+and recursively the levels above down to min_level. With a (I, N) shard,
+only the tiles owned by shard I are produced. An encoder, if given,
+overrides format and quality.
+Returns False if there were not enough tiles to continue.
+"""
+def process_level(level, dir, format='jpg', quality=95, outdir='.', m=None, min_level=0, shard=None, encoder=None):
+    m = m if m is not None else Metrics(progress=False)
+    encoder = encoders.get(encoder, format, quality)
+    if not os.path.exists(dir):
+        raise FileNotFoundError(f"Directory for level {level:02d} not found: {dir}")
+
+    m.log(f"Processing level: {level:02d} ({dir})")
+
+    directory = os.fsencode(dir)
+
+    if len(os.listdir(directory)) < 4:
+        m.log("Not enoguh tiles to continue!")
+        return False
+
+    mincol = 999999999999
+    minrow = 999999999999
+    maxcol = 0
+    maxrow = 0
+    for file in os.listdir(directory):
+        filename = os.fsdecode(file)
+        ok = re.search(r"^tx_\d+_\d+\.\w+", filename)
+        if ok is not None:
+            name = os.path.splitext(filename)[0]
+            tokens = name.split('_')
+            col = int(tokens[1])
+            row = int(tokens[2])
+            if col > maxcol:
+                maxcol = col
+            if col < mincol:
+                mincol = col
+            if row > maxrow:
+                maxrow = row
+            if row < minrow:
+                minrow = row
+
+    # MxN matrix 
+    M = maxrow + 1
+    N = maxcol + 1
+    # Create matrix of tiles
+    tiles = [[ 0 for i in range(0, N) ] for j in range(0, M)]
+    # Fill it with files
+    for file in os.listdir(directory):
+        filename = os.fsdecode(file)
+        ok = re.search(r"^tx_\d+_\d+\.\w+", filename)
+        if ok is not None:
+            name = os.path.splitext(filename)[0]
+            tokens = name.split('_')
+            col = int(tokens[1])
+            row = int(tokens[2])
+            tiles[row][col] = filename
+
+    l = level - 1
+    owned = [(i, j) for i in range(mincol, N, 2) for j in range(minrow, M, 2)
+             if sharding.owns(shard, l, i // 2, j // 2)]
+    m.add_total(len(owned))
+    leveldir = os.path.join(outdir, f"level{l:02d}")
+    if not os.path.exists(leveldir):
+        os.makedirs(leveldir)
+
+    cv2 = imaging.cv2()
+    # Every 4 tiles, we join them into one, and downsize it.
+    for i, j in owned: # col, row
+        im00 = imaging.load_image(os.path.join(dir, tiles[j][i]), m)
+        im10 = imaging.load_image(os.path.join(dir, tiles[j][i+1]), m)
+        im01 = imaging.load_image(os.path.join(dir, tiles[j+1][i]), m)
+        im11 = imaging.load_image(os.path.join(dir, tiles[j+1][i+1]), m)
+
+        # Actually stitch
+        # im00-im10 -> im0
+        # im01-im11 -> im1
+        im0= np.concatenate((im00, im10), axis=1)
+        im1 = np.concatenate((im01, im11), axis=1)
+        im = np.concatenate((im0, im1), axis=0)
+
+        tilesize = im00.shape[0]
+        # Resize to tile size
+        with m.stage("resize"):
+            tile = cv2.resize(im, dsize=(tilesize, tilesize), interpolation=cv2.INTER_CUBIC) 
+    
+        outfilename = "tx_" + str(int(i/2)) + "_" + str(int(j/2)) + "." + encoder.format
+        imaging.save_tile(os.path.join(leveldir, outfilename), tile, encoder, m)
+        m.count("tiles")
+        m.advance()
+
+    if l > min_level:
+        # Process next level up.
+        process_level(l, leveldir, outdir=outdir, m=m, min_level=min_level, shard=shard, encoder=encoder)
+
+    return True
+
+def build_pyramid(level, directory, format='jpg', quality=95, outdir='.', shard=None, metrics=None, encoder=None):
+    """
+    Builds all the levels above the given one, down to level 0. With a shard,
+    only the subtrees owned by the shard are reduced, down to the shard level;
+    the levels above are finished by merge_shards() once all shards are done.
+    Inputs:
+        level (int) : the level of the tiles in directory.
+        directory (str) : the input directory, containing the tiles of the level.
+        format (str) : output format, one of encoders.FORMATS.
+        quality (int) : JPG, WEBP and AVIF quality in [1, 100].
+        outdir (str) : where the 'levelLL' directories are created.
+        shard ((int, int)) : (I, N) to only produce the tiles owned by shard I of N, or None.
+        metrics (Metrics) : where to record timings and progress, or None.
+        encoder (Encoder) : encoder of the tiles, with its options. Overrides format and quality.
+    return:
+        bool : False if there were not enough tiles to build a level.
+    raises:
+        ValueError : with a shard, if level is not below the shard level.
+    """
+    min_level = 0 if shard is None else sharding.shard_level(shard[1])
+    if shard is not None and level <= min_level:
+        raise ValueError(f"a {shard[1]}-shard run needs a level below the shard level {min_level:02d}, "
+                         f"got {level:02d}: run it without sharding, or with --merge {shard[1]}")
+    if level <= min_level:
+        return True
+    return process_level(level, directory, format, quality, outdir, metrics, min_level, shard, encoder)
+
+def missing_tiles(level, directory):
+    """
+    (col, row) of the tiles of a level that are not in directory.
+    """
+    present = set()
+    for filename in os.listdir(directory):
+        ok = re.search(r"^tx_(\d+)_(\d+)\.\w+", filename)
+        if ok is not None:
+            present.add((int(ok.group(1)), int(ok.group(2))))
+    cols, rows = 2 ** (level + 1), 2 ** level
+    return [(c, r) for r in range(rows) for c in range(cols) if (c, r) not in present]
+
+def merge_shards(n, directory, format='jpg', quality=95, outdir='.', metrics=None, encoder=None):
+    """
+    Finishes the top levels of an N-shard build_pyramid() run. directory must
+    hold the tiles of the shard level gathered from all shards.
+    """
+    level = sharding.shard_level(n)
+    missing = missing_tiles(level, directory)
+    if missing:
+        shards = sorted({sharding.owner(level, c, r, n) for c, r in missing})
+        raise ValueError(f"{len(missing)} level {level:02d} tiles missing in {directory}, from shards {shards}")
+    return build_pyramid(level, directory, format, quality, outdir, metrics=metrics, encoder=encoder)
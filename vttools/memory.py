@@ -0,0 +1,155 @@
+"""
+Memory budget for tile processing. plan_split() chooses the strip height,
+queue depth and concurrency of a split from the image dimensions, the tile
+size, the channel count and the requested workers, and fails fast if the run
+cannot fit. MemoryAccountant enforces the budget at runtime by making every
+buffer reserve its bytes before it is allocated.
+"""
+
+import argparse
+import math
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+
+""" Fixed cost of the interpreter, numpy and OpenCV """
+BASE_BYTES = 128 * 2**20
+
+_units = {"": 1, "B": 1, "K": 2**10, "M": 2**20, "G": 2**30, "T": 2**40}
+
+def parse_size(x):
+    """
+    Parses a size such as '512M', '4G' or '1.5GiB' into bytes.
+    """
+    s = x.strip().upper()
+    for suffix in ("IB", "B"):
+        if s.endswith(suffix) and len(s) > len(suffix) and s[-len(suffix) - 1] in _units:
+            s = s[:-len(suffix)]
+            break
+    unit = s[-1] if s and s[-1] in _units else ""
+    try:
+        value = float(s[:len(s) - len(unit)])
+    except ValueError:
+        raise argparse.ArgumentTypeError("%r is not a size, e.g. 512M or 4G" % x)
+    if not math.isfinite(value):
+        raise argparse.ArgumentTypeError("%r is not a finite size" % x)
+    size = int(value * _units[unit])
+    if size < 1:
+        raise argparse.ArgumentTypeError("%r must be at least 1 byte" % x)
+    return size
+
+def format_size(n):
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if n < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TiB"
+
+"""
+Parameters of a split run.
+    strip_height : rows of pixels read at once (a multiple of the tile size).
+    queue_depth : tiles queued for encoding at most.
+    workers : encoding threads.
+    strip_bytes, task_bytes, fixed_bytes : the estimated cost of each strip,
+        each queued tile, and the rest (base cost and a fully decoded image).
+    estimate : estimated peak memory of the run.
+"""
+SplitPlan = namedtuple("SplitPlan", ["strip_height", "queue_depth", "workers",
+                                     "strip_bytes", "task_bytes", "fixed_bytes", "estimate"])
+
+def plan_split(width, height, channels, tilesize, workers=1, budget=None, itemsize=1,
+               windowed=True, compressed_bytes=0):
+    """
+    Plans a split of a width x height image with the given channels and bytes
+    per sample into tilesize tiles.
+    Inputs:
+        workers (int) : requested encoding threads.
+        budget (int) : memory budget in bytes, or None for no limit.
+        windowed (bool) : whether the source can be read in strips. Otherwise it
+                          is decoded whole, from its compressed_bytes.
+    return:
+        SplitPlan : the largest configuration that fits, up to the requested workers.
+    raises:
+        ValueError : if even one strip of tiles and one worker do not fit.
+    """
+    tile_bytes = tilesize * tilesize * channels * itemsize
+    # A tile being encoded needs about its size for the codec buffers and the output.
+    task_bytes = 2 * tile_bytes
+    if windowed:
+        fixed = BASE_BYTES
+        # The strip as read, and reordered to BGR.
+        row_bytes = 2 * width * channels * itemsize
+    else:
+        fixed = BASE_BYTES + compressed_bytes + width * height * channels * itemsize
+        row_bytes = 0
+
+    def estimate(strip_height, queue_depth, strips):
+        return fixed + strips * strip_height * row_bytes + queue_depth * task_bytes
+
+    workers = max(1, workers)
+    if budget is None:
+        strip_height = height if not windowed else min(height, max(tilesize, (64 * 2**20 // max(row_bytes, 1)) // tilesize * tilesize))
+        queue_depth = 2 * workers
+        strips = 2 if workers > 1 else 1
+        return SplitPlan(strip_height, queue_depth, workers, strip_height * row_bytes,
+                         task_bytes, fixed, estimate(strip_height, queue_depth, strips))
+
+    minimum = estimate(tilesize, 1, 1)
+    if minimum > budget:
+        raise ValueError("a split of %dx%d in %d tiles needs at least %s, the budget is %s"
+                         % (width, height, tilesize, format_size(minimum), format_size(budget)))
+
+    # Concurrency first, then as tall strips as the rest of the budget allows.
+    for w in range(workers, 0, -1):
+        queue_depth = 2 * w
+        strips = 2 if w > 1 else 1
+        if estimate(tilesize, queue_depth, strips) <= budget:
+            break
+    else:
+        w, queue_depth, strips = 1, 1, 1
+
+    if windowed:
+        spare = budget - estimate(0, queue_depth, strips)
+        rows = spare // (strips * row_bytes) // tilesize * tilesize
+        strip_height = max(tilesize, min(height, rows))
+    else:
+        strip_height = height
+    return SplitPlan(strip_height, queue_depth, w, strip_height * row_bytes, task_bytes, fixed,
+                     estimate(strip_height, queue_depth, strips))
+
+class MemoryAccountant:
+    """
+    Tracks the bytes reserved by the buffers of a run against a budget.
+    reserve() blocks until enough of the budget is free, so that producers
+    wait for consumers instead of growing past the budget.
+    """
+
+    def __init__(self, budget=None):
+        self.budget = budget
+        self.used = 0
+        self.peak = 0
+        self.cond = threading.Condition()
+
+    def acquire(self, nbytes):
+        with self.cond:
+            if self.budget is not None:
+                if nbytes > self.budget:
+                    raise ValueError("a buffer of %s does not fit in the budget of %s"
+                                     % (format_size(nbytes), format_size(self.budget)))
+                while self.used + nbytes > self.budget:
+                    self.cond.wait()
+            self.used += nbytes
+            self.peak = max(self.peak, self.used)
+
+    def release(self, nbytes):
+        with self.cond:
+            self.used -= nbytes
+            self.cond.notify_all()
+
+    @contextmanager
+    def reserve(self, nbytes):
+        self.acquire(nbytes)
+        try:
+            yield
+        finally:
+            self.release(nbytes)
@@ -0,0 +1,191 @@
+"""
+Lightweight instrumentation shared by the scripts: time per stage, counters,
+byte totals, a throttled progress bar, and optional JSON-lines metrics and a
+final profile summary.
+
+Usage:
+    m = metrics.from_args(args, total=ntiles, label="split")
+    with m.stage("encode"):
+        ...
+    m.add_bytes("written", len(buf))
+    m.advance()
+    m.close()
+"""
+
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+def add_arguments(parser):
+    """
+    Adds the --no-progress, --metrics and --profile options to an argparse parser.
+    """
+    parser.add_argument('--no-progress', dest='progress', default=True, action='store_false',
+                        help='Do not show the progress bar.')
+    parser.add_argument('--metrics', type=str, default=None, metavar='FILE',
+                        help='Append JSON-lines metrics (periodic snapshots and a final summary) to FILE.')
+    parser.add_argument('--profile', default=False, action='store_true',
+                        help='Print the time spent per stage, the counters and the byte totals at the end.')
+
+def from_args(args, total=0, label=""):
+    """
+    Creates a Metrics instance configured from the options of add_arguments().
+    """
+    return Metrics(total=total, label=label, progress=args.progress,
+                   jsonl=args.metrics, profile=args.profile)
+
+class Metrics:
+    """
+    Accumulates stage timings, counters and byte totals. All methods are
+    thread-safe. Output is throttled to one update every `interval` seconds,
+    so the per-tile cost is a few clock reads.
+    """
+
+    def __init__(self, total=0, label="", progress=True, jsonl=None, profile=False,
+                 stream=sys.stderr, interval=0.25):
+        self.total = total
+        self.label = label
+        self.progress = progress and stream.isatty()
+        self.profile = profile
+        self.stream = stream
+        self.interval = interval
+        self.jsonl = open(jsonl, "a") if jsonl is not None else None
+
+        self.done = 0
+        self.stages = {}
+        self.counters = {}
+        self.bytes = {}
+        self.start = time.perf_counter()
+        self.last = 0.0
+        self.lock = threading.Lock()
+        self.closed = False
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Times the enclosed block and adds it to the given stage.
+        """
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - t0)
+
+    def add_time(self, name, seconds, calls=1):
+        with self.lock:
+            total, n = self.stages.get(name, (0.0, 0))
+            self.stages[name] = (total + seconds, n + calls)
+
+    def merge_stages(self, stages):
+        """
+        Adds the {stage: (seconds, calls)} timings measured elsewhere, e.g. in a worker process.
+        """
+        for name, (seconds, calls) in stages.items():
+            self.add_time(name, seconds, calls)
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_bytes(self, name, n):
+        with self.lock:
+            self.bytes[name] = self.bytes.get(name, 0) + n
+
+    def add_total(self, n):
+        with self.lock:
+            self.total += n
+
+    def advance(self, n=1):
+        """
+        Marks n work items as done, and refreshes the output if it is due.
+        """
+        with self.lock:
+            self.done += n
+            now = time.perf_counter()
+            if now - self.last < self.interval:
+                return
+            self.last = now
+        self._refresh(now)
+
+    def log(self, message):
+        """
+        Prints a message without breaking the progress bar.
+        """
+        with self.lock:
+            if self.progress:
+                self.stream.write("\r\033[K")
+            print(message, file=self.stream)
+            if self.progress:
+                self.stream.write(self._bar(time.perf_counter()))
+                self.stream.flush()
+
+    def snapshot(self, now=None):
+        now = time.perf_counter() if now is None else now
+        with self.lock:
+            return self._snapshot(now)
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            now = time.perf_counter()
+            if self.progress:
+                self.stream.write("\r\033[K" + self._bar(now) + "\n")
+                self.stream.flush()
+            snap = self._snapshot(now)
+            if self.jsonl is not None:
+                snap["final"] = True
+                self.jsonl.write(json.dumps(snap) + "\n")
+                self.jsonl.close()
+        if self.profile:
+            self._print_profile(snap)
+
+    def _snapshot(self, now):
+        # Called with the lock held.
+        return {
+            "label": self.label,
+            "elapsed": now - self.start,
+            "done": self.done,
+            "total": self.total,
+            "stages": {k: {"seconds": s, "calls": n} for k, (s, n) in self.stages.items()},
+            "counters": dict(self.counters),
+            "bytes": dict(self.bytes),
+        }
+
+    def _refresh(self, now):
+        # Both outputs are written under the lock, so that lines from several threads do not interleave.
+        with self.lock:
+            if self.closed:
+                return
+            if self.progress:
+                self.stream.write("\r\033[K" + self._bar(now))
+                self.stream.flush()
+            if self.jsonl is not None:
+                self.jsonl.write(json.dumps(self._snapshot(now)) + "\n")
+
+    def _bar(self, now, width=30):
+        elapsed = now - self.start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        if self.total:
+            frac = min(self.done / self.total, 1.0)
+            filled = int(frac * width)
+            eta = (self.total - self.done) / rate if rate > 0 else 0.0
+            return (f"{self.label} [{'#' * filled}{'.' * (width - filled)}] "
+                    f"{self.done}/{self.total} {frac * 100.0:.1f}% {rate:.1f}/s eta {eta:.0f}s")
+        return f"{self.label} {self.done} {rate:.1f}/s"
+
+    def _print_profile(self, snap):
+        out = self.stream
+        elapsed = snap["elapsed"]
+        print(f"Profile ({self.label}): {snap['done']} items in {elapsed:.2f}s", file=out)
+        for name, s in sorted(snap["stages"].items(), key=lambda kv: -kv[1]["seconds"]):
+            per_call = s["seconds"] / s["calls"] * 1000.0 if s["calls"] else 0.0
+            share = s["seconds"] * 100.0 / elapsed if elapsed > 0 else 0.0
+            print(f"  {name:10s} {s['seconds']:10.3f}s {share:6.1f}%  {s['calls']:8d} calls  {per_call:8.3f} ms/call", file=out)
+        for name, n in sorted(snap["counters"].items()):
+            print(f"  {name:10s} {n}", file=out)
+        for name, n in sorted(snap["bytes"].items()):
+            print(f"  {name:10s} {n / 2**20:.2f} MiB", file=out)
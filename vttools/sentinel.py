@@ -0,0 +1,323 @@
+"""
+Downloads true color Sentinel-2 cloudless mosaic tiles from the CDSE Sentinel
+Hub Processing API, aligned to the SVT tile grid. sentinelhub and Pillow are
+imported when a tile is actually requested.
+"""
+
+import os
+
+from vttools import encoders, imaging, shard as sharding
+from vttools.metrics import Metrics
+from vttools.tiles import get_svt_tile_bbox, tile_has_land
+
+""" Default output directory """
+output_dir = "out"
+
+""" Default quality and encoder of the downloaded tiles """
+QUALITY = 88
+BACKEND = "pil"
+
+def get_client_credentials():
+    client_id = os.getenv("CLIENT_ID")
+    client_secret = os.getenv("CLIENT_SECRET")
+
+    if not client_id or not client_secret:
+        raise RuntimeError("Environment variables CLIENT_ID and CLIENT_SECRET must be set.")
+
+    return client_id, client_secret
+
+# --- CONFIG ---
+TOKEN_URL = "https://identity.dataspace.copernicus.eu/auth/realms/CDSE/protocol/openid-connect/token"
+API_URL = "https://sh.dataspace.copernicus.eu/api/v1/process"
+
+def get_evalscript():
+    evalscript = """
+    //VERSION=3
+    function setup() {
+      return {
+        input: ["B02", "B03", "B04", "dataMask"],
+        output: { bands: 4 },
+      }
+    }
+    // Contrast enhance / highlight compress
+
+    const maxR = 3.0; // max reflectance
+    const midR = 0.13;
+    const sat = 1.2;
+    const gamma = 1.8;
+    const scalefac = 10000;
+
+    function evaluatePixel(smp) {
+      const rgbLin = satEnh(sAdj(smp.B04/scalefac), sAdj(smp.B03/scalefac), sAdj(smp.B02/scalefac));
+      return [sRGB(rgbLin[0]), sRGB(rgbLin[1]), sRGB(rgbLin[2]), smp.dataMask];
+    }
+
+    function sAdj(a) {
+      return adjGamma(adj(a, midR, 1, maxR));
+    }
+
+    const gOff = 0.01;
+    const gOffPow = Math.pow(gOff, gamma);
+    const gOffRange = Math.pow(1 + gOff, gamma) - gOffPow;
+
+    function adjGamma(b) {
+      return (Math.pow((b + gOff), gamma) - gOffPow)/gOffRange;
+    }
+
+    // Saturation enhancement
+    function satEnh(r, g, b) {
+      const avgS = (r + g + b) / 3.0 * (1 - sat);
+      return [clip(avgS + r * sat), clip(avgS + g * sat), clip(avgS + b * sat)];
+    }
+
+    function clip(s) {
+      return s < 0 ? 0 : s > 1 ? 1 : s;
+    }
+
+    //contrast enhancement with highlight compression
+    function adj(a, tx, ty, maxC) {
+      var ar = clip(a / maxC, 0, 1);
+      return ar * (ar * (tx/maxC + ty -1) - ty) / (ar * (2 * tx/maxC - 1) - tx/maxC);
+    }
+
+    const sRGB = (c) => c <= 0.0031308 ? (12.92 * c) : (1.055 * Math.pow(c, 0.41666666666) - 0.055);
+    """
+        
+    return evalscript
+
+def tile_path(level, col, row, output_dir=output_dir, ext="jpg"):
+    level_dir = os.path.join(output_dir, f"level{level:02d}")
+    filename = f"tx_{col}_{row}.{ext}"
+    return filename, os.path.join(level_dir, filename)
+
+def tile_exists(lat, lon, level, output_dir=output_dir, ext="jpg"):
+    _, col, row = get_svt_tile_bbox(lat, lon, level)
+    filename, filepath = tile_path(level, col, row, output_dir, ext)
+    return os.path.isfile(filepath), filename, filepath
+
+
+def request_sentinel_true_col(lat, lon, level, date_from, date_to, width=1024, height=1024):
+    from sentinelhub import SHConfig, DataCollection, SentinelHubRequest, BBox, CRS, MimeType
+
+    client_id, client_secret = get_client_credentials()
+    config = SHConfig()
+    config.sh_client_id = client_id
+    config.sh_client_secret = client_secret
+    config.sh_token_url = TOKEN_URL
+    config.sh_base_url = "https://sh.dataspace.copernicus.eu"
+
+    bbox, col, row = get_svt_tile_bbox(lat, lon, level)
+
+    aoi_bbox = BBox(bbox=bbox, crs=CRS.WGS84)
+    aoi_size = (width, height)
+
+    S2l3_cloudless_mosaic = DataCollection.define_byoc(
+        collection_id="5460de54-082e-473a-b6ea-d5cbe3c17cca"
+    )
+    request_true_color = SentinelHubRequest(
+        evalscript=get_evalscript(),
+        input_data=[
+            SentinelHubRequest.input_data(
+                data_collection=S2l3_cloudless_mosaic,
+                time_interval=(date_from, date_to),
+            )
+        ],
+        responses=[SentinelHubRequest.output_response("default", MimeType.PNG)],
+        bbox=aoi_bbox,
+        size=aoi_size,
+        config=config,
+        data_folder="./cache",
+    )
+
+    true_col_imgs = request_true_color.get_data(save_data=False)
+
+    return true_col_imgs[0], col, row
+
+def download_tile(level, lat, lon, date_from, date_to, width=1024, height=1024,
+                  overwrite=False, output_dir=output_dir, metrics=None, encoder=None):
+    """
+    Downloads the tile containing (lat, lon) at the given level to
+    output_dir/levelLL/tx_C_R.ext. The tile is encoded with the given
+    Encoder, or as a JPG of QUALITY with Pillow.
+    return:
+        filepath (str) : the saved file, or None if it existed and overwrite is off.
+    """
+    m = metrics if metrics is not None else Metrics(progress=False)
+    if encoder is None:
+        encoder = encoders.Encoder("jpg", QUALITY, BACKEND)
+    exists, fname, fpath = tile_exists(lat, lon, level, output_dir, encoder.format)
+    if exists and not overwrite:
+        m.count("existing")
+        return None
+        
+    with m.stage("network"):
+        image_bytes, col, row = request_sentinel_true_col(
+            lat,
+            lon,
+            level,
+            date_from,
+            date_to,
+            width=width,
+            height=height
+        )
+    m.count("requests")
+    arr_rgb = image_bytes[:, :, :3]  # Drop alpha channel
+
+    # Build output directory
+    level_dir = os.path.dirname(fpath)
+    os.makedirs(level_dir, exist_ok=True)
+    # Write file
+    filepath = fpath
+    imaging.save_tile(filepath, imaging.rgb_to_bgr(arr_rgb), encoder, m)
+    m.count("overwritten" if exists else "saved")
+    return filepath
+
+def tile_center(bbox):
+    """
+    Bounds and center of a [lon0, lat0, lon1, lat1] box, as
+    (minlat, minlon, maxlat, maxlon), (center_lat, center_lon), (span_lat, span_lon).
+    """
+    minlat = min(bbox[1], bbox[3])
+    maxlat = max(bbox[1], bbox[3])
+    minlon = min(bbox[0], bbox[2])
+    maxlon = max(bbox[0], bbox[2])
+    span_lat = (maxlat - minlat) / 2.0
+    span_lon = (maxlon - minlon) / 2.0
+    return (minlat, minlon, maxlat, maxlon), (minlat + span_lat, minlon + span_lon), (span_lat, span_lon)
+
+def process_tile_rec(latitude, longitude, level, l1, keep_water, counts, m, options, shard=None, root=None):
+    bbox, col, row = get_svt_tile_bbox(latitude, longitude, level)
+    
+    # Compute center longitude and latitude
+    (minlat, minlon, maxlat, maxlon), (center_lat, center_lon), (span_lat, span_lon) = tile_center(bbox)
+
+    if root is None:
+        root = (level, col, row)
+    if not sharding.owns(shard, level, col, row, root):
+        if level >= sharding.shard_level(shard[1], root):
+            # The whole subtree belongs to another shard.
+            m.advance(count_tiles(level, l1))
+            return
+        m.advance()
+    else:
+        with m.stage("landmask"):
+            has_land = tile_has_land(minlat, minlon, maxlat, maxlon)
+        if not has_land and not keep_water:
+            counts[1] += 1
+            m.count("water")
+
+        if has_land or keep_water:
+            download_tile(level, center_lat, center_lon, metrics=m, **options)
+            counts[0] += 1
+        m.advance()
+
+    # Children
+    lats = span_lat / 2.0
+    lons = span_lon / 2.0
+    if level < l1:
+        # Subdivide into 4
+        process_tile_rec(center_lat - lats, center_lon - lons, level + 1, l1, keep_water, counts, m, options, shard, root)
+        process_tile_rec(center_lat - lats, center_lon + lons, level + 1, l1, keep_water, counts, m, options, shard, root)
+        process_tile_rec(center_lat + lats, center_lon - lons, level + 1, l1, keep_water, counts, m, options, shard, root)
+        process_tile_rec(center_lat + lats, center_lon + lons, level + 1, l1, keep_water, counts, m, options, shard, root)
+
+def count_tiles(level0, level1):
+    """ Number of tiles in the subtrees from level0 down to level1, both included. """
+    ops = 0
+    for l in range(level0, level1 + 1):
+        ops = ops + 4 ** (l - level0)
+    return ops
+
+def download_tiles(lat, lon, level0, level1, date_from, date_to, keep_water=False, shard=None,
+                   metrics=None, **options):
+    """
+    Downloads the tile containing (lat, lon) at level0 and all its
+    descendants down to level1, both included. With a (I, N) shard, only
+    the tiles owned by shard I are downloaded.
+    Extra keyword arguments are passed on to download_tile().
+    return:
+        (downloaded, skipped) : tiles requested, and all-water tiles skipped.
+    """
+    if level0 >= level1:
+        raise ValueError(f"level0 ({level0}) must be less than level1 ({level1}).")
+    m = metrics if metrics is not None else Metrics(progress=False)
+    m.add_total(count_tiles(level0, level1))
+    counts = [0, 0]
+    options.update(date_from=date_from, date_to=date_to)
+    process_tile_rec(lat, lon, level0, level1, keep_water, counts, m, options, shard)
+    return tuple(counts)
+
+def download_level(level, date_from, date_to, keep_water=False, shard=None, metrics=None, **options):
+    """
+    Downloads all the tiles of a level, for the whole Earth. With a (I, N)
+    shard, only the tiles owned by shard I are downloaded.
+    Extra keyword arguments are passed on to download_tile().
+    return:
+        (downloaded, skipped) : tiles requested, and all-water tiles skipped.
+    """
+    m = metrics if metrics is not None else Metrics(progress=False)
+    cols = (2 ** level) * 2
+    rows = 2 ** level
+    m.add_total(cols * rows)
+
+    downloaded = 0
+    skipped = 0
+    lat0 = 90.0
+    lon0 = -180.0
+    step = 180.0 / rows
+    for col in range(cols):
+        for row in range(rows):
+            lon = lon0 + col * step
+            lat = lat0 - row * step
+
+            bbox, col, row = get_svt_tile_bbox(lat, lon, level)
+            if not sharding.owns(shard, level, col, row):
+                m.advance()
+                continue
+            # Compute center longitude and latitude
+            (minlat, minlon, maxlat, maxlon), (lat, lon), _ = tile_center(bbox)
+
+            with m.stage("landmask"):
+                has_land = tile_has_land(minlat, minlon, maxlat, maxlon)
+            if not has_land and not keep_water:
+                skipped += 1
+                m.count("water")
+
+            if has_land or keep_water:
+                download_tile(level, lat, lon, date_from, date_to, metrics=m, **options)
+                downloaded += 1
+            m.advance()
+    return downloaded, skipped
+
+def read_tile_list(filename):
+    """
+    Reads (level, col, row) tiles from a file with one "level col row" per
+    line, as written by verify-pyramid.py --list-missing.
+    """
+    result = []
+    with open(filename) as f:
+        for line in f:
+            tokens = line.split()
+            if tokens and not tokens[0].startswith("#"):
+                result.append(tuple(int(t) for t in tokens[:3]))
+    return result
+
+def download_list(tile_list, date_from, date_to, overwrite=True, metrics=None, **options):
+    """
+    Downloads the given (level, col, row) tiles, overwriting existing
+    (e.g. corrupt) files by default.
+    Extra keyword arguments are passed on to download_tile().
+    return:
+        int : tiles downloaded.
+    """
+    from vttools.tiles import level_shape, tileExtent
+    m = metrics if metrics is not None else Metrics(progress=False)
+    m.add_total(len(tile_list))
+    downloaded = 0
+    for level, col, row in tile_list:
+        (lon0, lat0, lon1, lat1), _ = tileExtent(col, row, *level_shape(level))
+        if download_tile(level, (lat0 + lat1) / 2.0, (lon0 + lon1) / 2.0, date_from, date_to,
+                         overwrite=overwrite, metrics=m, **options) is not None:
+            downloaded += 1
+        m.advance()
+    return downloaded
@@ -0,0 +1,96 @@
+"""
+Deterministic partition of the tile space across N shards (machines or
+processes), with no shared coordinator.
+
+The tiles of the shard level Ls, the first level with at least 4N tiles (so
+that shard loads differ by at most a quarter), are the roots of the subtrees
+that are distributed. They are ranked in Morton order (the two level-0 roots
+first, then Z-order inside each root), and shard I owns the contiguous rank
+range [I * count / N, (I + 1) * count / N). A tile below Ls belongs to the
+shard that owns its ancestor at Ls, so every shard can reduce its subtrees
+down to Ls locally. The few levels above Ls (whose children cross shard
+boundaries) are finished by a merge step. Tiles above Ls are spread by their
+own Morton rank where no reduction is involved, e.g. when downloading.
+
+A download rooted at a single tile partitions the subtree of that tile in
+the same way, so that a small region is still spread over all shards.
+"""
+
+import argparse
+
+from vttools.tiles import level_shape
+
+def parse_shard(x):
+    """
+    Parses an 'I/N' shard parameter into (I, N), with 0 <= I < N.
+    """
+    try:
+        i, n = (int(v) for v in x.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError("%r is not of the form I/N" % x)
+    if n < 1 or not 0 <= i < n:
+        raise argparse.ArgumentTypeError("%r needs N >= 1 and 0 <= I < N" % x)
+    return i, n
+
+def morton(col, row):
+    """
+    Interleaves the bits of col (even bits) and row (odd bits).
+    """
+    code = 0
+    bit = 0
+    while col or row:
+        code |= (col & 1) << (2 * bit) | (row & 1) << (2 * bit + 1)
+        col >>= 1
+        row >>= 1
+        bit += 1
+    return code
+
+def rank(level, col, row):
+    """
+    Position of a tile in the Morton order of its level, in [0, 2 * 4^level).
+    """
+    half = 2 ** level
+    return (col // half) * 4 ** level + morton(col % half, row)
+
+def shard_level(n, root=None):
+    """
+    Level whose tiles are the subtree roots distributed over n shards. With a
+    (level, col, row) root, only the subtree of that tile is partitioned.
+    """
+    if n <= 1:
+        return 0 if root is None else root[0]
+    if root is None:
+        level = 0
+        while level_shape(level)[0] * level_shape(level)[1] < 4 * n:
+            level += 1
+        return level
+    d = 0
+    while 4 ** d < 4 * n:
+        d += 1
+    return root[0] + d
+
+def owner(level, col, row, n, root=None):
+    """
+    Shard in [0, n) that owns the given tile. With a (level, col, row) root,
+    the tile must be in the subtree of the root, which is partitioned alone.
+    """
+    ls = shard_level(n, root)
+    if level > ls:
+        d = level - ls
+        col >>= d
+        row >>= d
+        level = ls
+    if root is None:
+        nc, nr = level_shape(level)
+        return rank(level, col, row) * n // (nc * nr)
+    d = level - root[0]
+    return morton(col - (root[1] << d), row - (root[2] << d)) * n // 4 ** d
+
+def owns(shard, level, col, row, root=None):
+    """
+    Whether the (I, N) shard owns the given tile. A None shard owns everything.
+    """
+    if shard is None:
+        return True
+    i, n = shard
+    return owner(level, col, row, n, root) == i
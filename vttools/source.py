@@ -0,0 +1,98 @@
+"""
+Image sources that split_image() reads in strips. GDAL rasters are read
+window by window; other formats are decoded whole by OpenCV, on first read.
+"""
+
+import importlib.util
+import os
+
+import numpy as np
+
+from vttools import imaging
+from vttools.headers import exif_orientation, image_size
+
+class GdalSource:
+    """
+    A raster read in windows with GDAL, in its native dtype. With color, the
+    windows are 3-channel BGR like an OpenCV IMREAD_COLOR decode: gray is
+    replicated and alpha is dropped.
+    """
+    windowed = True
+
+    def __init__(self, filename, color=False):
+        from osgeo import gdal, gdal_array
+        self.dataset = gdal.Open(filename, gdal.GA_ReadOnly)
+        self.width = self.dataset.RasterXSize
+        self.height = self.dataset.RasterYSize
+        self.color = color
+        # Planned with the bands as read, which is at least the 3 of the output.
+        self.channels = max(3, self.dataset.RasterCount) if color else self.dataset.RasterCount
+        dtype = gdal_array.GDALTypeCodeToNumericTypeCode(self.dataset.GetRasterBand(1).DataType)
+        self.itemsize = dtype().itemsize
+        self.compressed_bytes = 0
+
+    def read(self, x, y, w, h, m):
+        from vttools import tif
+        with m.stage("read"):
+            window = tif.read_window(self.dataset, x, y, w, h)
+        m.add_bytes("read", window.nbytes)
+        if self.color:
+            if window.shape[2] < 3:
+                window = np.repeat(window[:, :, :1], 3, axis=2)
+            window = window[:, :, :3]
+        # GDAL gives RGB(A), OpenCV expects BGR(A).
+        return imaging.rgb_to_bgr(window)
+
+class DecodedSource:
+    """
+    An image decoded whole by OpenCV into 8-bit BGR. The dimensions come from
+    the JPEG or PNG header when possible, so that a run can be planned before
+    decoding.
+    """
+    windowed = False
+
+    def __init__(self, filename, m):
+        self.filename = filename
+        self.image = None
+        self.channels = 3
+        self.itemsize = 1
+        self.compressed_bytes = os.path.getsize(filename)
+        size = image_size(filename)
+        if size is not None:
+            self.width, self.height = size[0], size[1]
+            # OpenCV applies the EXIF orientation, and 5 to 8 are transposed.
+            if exif_orientation(filename) >= 5:
+                self.width, self.height = self.height, self.width
+        else:
+            self._load(m)
+
+    def _load(self, m):
+        self.image = imaging.load_image(self.filename, m)
+        self.height, self.width = self.image.shape[:2]
+
+    def read(self, x, y, w, h, m):
+        if self.image is None:
+            self._load(m)
+        return self.image[y:y+h, x:x+w]
+
+def has_gdal():
+    return importlib.util.find_spec("osgeo") is not None
+
+def open_source(filename, m, partial=False):
+    """
+    Opens the image with GDAL if it is a GeoTiff, with OpenCV otherwise.
+    With partial, only a region of the image is going to be read, and other
+    formats are also opened with GDAL when it is installed. Its JPEG and PNG
+    drivers decode scanlines in order and stop at the last row of the window,
+    so the rest of the image is never held in memory. The windows match what
+    OpenCV decodes, so that a region gives the same tiles as a full split.
+    """
+    if filename.endswith('.tif'):
+        return GdalSource(filename)
+    # OpenCV applies the EXIF orientation, expands palettes and reduces 16-bit
+    # images to 8 bits, GDAL does not.
+    if partial and has_gdal() and exif_orientation(filename) == 1:
+        source = GdalSource(filename, color=True)
+        if source.itemsize == 1 and source.dataset.GetRasterBand(1).GetColorTable() is None:
+            return source
+    return DecodedSource(filename, m)
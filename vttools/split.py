@@ -0,0 +1,211 @@
+"""
+Splits a large image into NxN tiles named "tx_C_R.ext".
+"""
+
+import argparse
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from vttools import encoders, imaging, shard as sharding, tiles
+from vttools.memory import MemoryAccountant, format_size, plan_split
+from vttools.metrics import Metrics
+from vttools.source import open_source
+
+def infer_level(cols, rows, startcol=0, startrow=0):
+    """
+    SVT level of a full-sphere grid of cols x rows tiles starting at (0, 0), or None.
+    """
+    if startcol != 0 or startrow != 0 or cols != 2 * rows or rows & (rows - 1) != 0:
+        return None
+    return int(math.log2(rows))
+
+def parse_window(x):
+    """
+    Parses an 'x,y,w,h' pixel window.
+    """
+    try:
+        window = tuple(int(v) for v in x.split(','))
+    except ValueError:
+        window = ()
+    if len(window) != 4 or window[0] < 0 or window[1] < 0 or window[2] <= 0 or window[3] <= 0:
+        raise argparse.ArgumentTypeError("%r is not of the form x,y,w,h" % x)
+    return window
+
+def parse_bbox(x):
+    """
+    Parses a 'lon0,lat0,lon1,lat1' bounding box in degrees.
+    """
+    try:
+        bbox = tuple(float(v) for v in x.split(','))
+    except ValueError:
+        bbox = ()
+    if len(bbox) != 4:
+        raise argparse.ArgumentTypeError("%r is not of the form lon0,lat0,lon1,lat1" % x)
+    return bbox
+
+def window_tiles(window, tilesize, cols, rows):
+    """
+    Columns and rows of the tiles that intersect the (x, y, w, h) pixel window,
+    as two ranges clipped to the cols x rows grid. The window snaps outwards
+    to the tile grid.
+    """
+    x, y, w, h = window
+    return (range(x // tilesize, min(cols, -(-(x + w) // tilesize))),
+            range(y // tilesize, min(rows, -(-(y + h) // tilesize))))
+
+def bbox_tiles(bbox, level, startcol, startrow, cols, rows):
+    """
+    Columns and rows of the tiles at the given level that intersect the
+    (lon0, lat0, lon1, lat1) box, relative to the image, as two ranges clipped
+    to the cols x rows grid that starts at tile (startcol, startrow).
+    """
+    cs, rs = tiles.tiles_in_bbox(*bbox, level)
+    return (range(max(0, cs.start - startcol), min(cols, cs.stop - startcol)),
+            range(max(0, rs.start - startrow), min(rows, rs.stop - startrow)))
+
+def split_image(filename, tilesize, startcol=0, startrow=0, format='jpg', quality=95,
+                outdir='.', level=None, shard=None, window=None, bbox=None, workers=1,
+                max_memory=None, metrics=None, encoder=None):
+    """
+    Splits the given image into tiles of tilesize x tilesize pixels. The image
+    is read in strips of tile rows when the format allows it, and the tiles
+    are encoded by a pool of threads. With a window or a bbox, only the tiles
+    that intersect it are read and written, with the same names as in a full
+    split.
+    Inputs:
+        filename (str) : the input image.
+        tilesize (int) : resolution of the produced tiles.
+        startcol, startrow (int) : column and row of the first tile, used in the file names.
+        format (str) : output format, one of encoders.FORMATS.
+        quality (int) : JPG, WEBP and AVIF quality in [1, 100].
+        outdir (str) : output directory.
+        level (int) : SVT level of the tiles. Only needed with shard or bbox, when the
+                      image is not a full-sphere 2:1 grid starting at (0, 0).
+        shard ((int, int)) : (I, N) to only write the tiles owned by shard I of N, or None.
+        window ((int, int, int, int)) : (x, y, w, h) region of the image in pixels, or None.
+        bbox ((float, float, float, float)) : (lon0, lat0, lon1, lat1) region in degrees,
+                                              or None.
+        workers (int) : encoding threads.
+        max_memory (int) : memory budget in bytes, or None. Strip height, queue depth
+                           and concurrency are chosen to fit it.
+        metrics (Metrics) : where to record timings and progress, or None.
+        encoder (Encoder) : encoder of the tiles, with its options. Overrides format and quality.
+    return:
+        int : number of tiles written.
+    raises:
+        ValueError : if the image is not divisible in tiles, the region does not
+                     intersect it, or the run does not fit in max_memory.
+    """
+    m = metrics if metrics is not None else Metrics(progress=False)
+    encoder = encoders.get(encoder, format, quality)
+    partial = window is not None or bbox is not None
+    source = open_source(filename, m, partial)
+
+    M = tilesize
+    N = tilesize
+
+    # Check divisibility
+    if source.height % N != 0:
+        raise ValueError("image height not divisible by tile size: %d -> %d" % (source.height, N))
+    if source.width % M != 0:
+        raise ValueError("image width not divisible by tile size: %d -> %d" % (source.width, M))
+
+    cols = source.width // M
+    rows = source.height // N
+    if (shard is not None or bbox is not None) and level is None:
+        level = infer_level(cols, rows, startcol, startrow)
+        if level is None:
+            raise ValueError("the level of the tiles is needed to shard or cut a partial image")
+
+    if window is not None:
+        cs, rs = window_tiles(window, M, cols, rows)
+    elif bbox is not None:
+        cs, rs = bbox_tiles(bbox, level, startcol, startrow, cols, rows)
+    else:
+        cs, rs = range(cols), range(rows)
+    if not cs or not rs:
+        raise ValueError("the region does not intersect the image")
+    if partial:
+        m.log("Region: tiles %d-%d x %d-%d, pixels %d,%d %dx%d"
+              % (cs.start + startcol, cs.stop - 1 + startcol, rs.start + startrow, rs.stop - 1 + startrow,
+                 cs.start * M, rs.start * N, len(cs) * M, len(rs) * N))
+        if not source.windowed:
+            m.log("GDAL is not available for this format, the whole image is decoded")
+
+    # Strips only span the region, a decoded image is always whole.
+    x0, width = cs.start * M, len(cs) * M
+    p = plan_split(width if source.windowed else source.width,
+                   len(rs) * N if source.windowed else source.height,
+                   source.channels, tilesize, workers, max_memory, source.itemsize,
+                   source.windowed, source.compressed_bytes)
+
+    def owned(r):
+        return [c for c in cs if sharding.owns(shard, level, c + startcol, r + startrow)]
+
+    total = len(cs) * len(rs) if shard is None else sum(len(owned(r)) for r in rs)
+    m.add_total(total)
+    m.log("Plan: %d workers, strips of %d rows, queue of %d tiles, estimated peak %s"
+          % (p.workers, p.strip_height, p.queue_depth, format_size(p.estimate)))
+    os.makedirs(outdir, exist_ok=True)
+
+    accountant = MemoryAccountant(max_memory)
+    accountant.acquire(p.fixed_bytes)
+    queue = threading.BoundedSemaphore(p.queue_depth)
+    failure = []
+
+    def encode(tile, fname):
+        try:
+            imaging.save_tile(os.path.join(outdir, fname), tile, encoder, m)
+            m.count("tiles")
+            m.advance()
+        except Exception as e:
+            failure.append(e)
+        finally:
+            accountant.release(p.task_bytes)
+            queue.release()
+
+    strip_rows = p.strip_height // N
+    # With several workers, the next strip is read while the previous one is encoded.
+    overlap = p.workers > 1
+    previous = ([], 0)
+
+    def finish(pending, strip_bytes):
+        for future in pending:
+            future.result()
+        accountant.release(strip_bytes)
+        if failure:
+            raise failure[0]
+
+    with ThreadPoolExecutor(max_workers=p.workers) as pool:
+        for r0 in range(rs.start, rs.stop, strip_rows):
+            r1 = min(rs.stop, r0 + strip_rows)
+            strip_tiles = [(r, owned(r)) for r in range(r0, r1)]
+            if not any(row_cols for _, row_cols in strip_tiles):
+                continue
+            if not overlap:
+                finish(*previous)
+                previous = ([], 0)
+            strip_bytes = (r1 - r0) * N * width * source.channels * source.itemsize * 2 if source.windowed else 0
+            accountant.acquire(strip_bytes)
+            strip = source.read(x0, r0 * N, width, (r1 - r0) * N, m)
+            pending = []
+            for r, row_cols in strip_tiles:
+                for c in row_cols:
+                    if failure:
+                        raise failure[0]
+                    queue.acquire()
+                    accountant.acquire(p.task_bytes)
+                    tile = strip[(r - r0)*N:(r - r0 + 1)*N, c*M - x0:(c+1)*M - x0]
+                    fname = 'tx_' + str(c + startcol) + '_' + str(r + startrow) + '.' + encoder.format
+                    pending.append(pool.submit(encode, tile, fname))
+            # The strip is freed once all its tiles are encoded.
+            del strip
+            finish(*previous)
+            previous = (pending, strip_bytes)
+        finish(*previous)
+
+    if max_memory is not None:
+        m.log("Peak reserved memory: %s of %s" % (format_size(accountant.peak), format_size(max_memory)))
+    return total
@@ -0,0 +1,368 @@
+import numpy as np
+import os.path
+import re
+
+from osgeo import gdal
+from osgeo import gdal_array
+from osgeo import osr
+
+gdal.UseExceptions()
+
+def get_gain_band(input_file):
+    """get GAIN_BAND from meta file (*.tif.txt)"""
+     # define file name of *.tif.txt
+    ifile_txt = re.sub(r'.tif', '.tif.txt', input_file)
+    ld = open(ifile_txt)
+    lines = ld.readlines()
+    ld.close()
+    
+    gain_band = []
+    for line in lines:
+        if line.find("GAIN_BAND") >= 0:
+             gain_band.append(float((re.split(' ', line)[1]).strip()))
+    return gain_band
+
+def tif2array(input_file, calc_gain=True):
+    """
+    read GeoTiff and convert to numpy.ndarray.
+    Inputs:
+        input_file (str) : the name of input GeoTiff file.
+        calc_gain (bool) : wheter calc GAIN to DN  or not (defaul:True).
+    return:
+        image(np.array) : image for each bands
+        dataset : for gdal's data drive.
+    """
+    dataset = gdal.Open(input_file, gdal.GA_ReadOnly)
+    # Allocate our array using the first band's datatype
+    image_datatype = dataset.GetRasterBand(1).DataType
+    image = np.zeros((dataset.RasterYSize, dataset.RasterXSize, dataset.RasterCount),
+                     dtype=float)
+    
+    if calc_gain == True:
+        # get gain
+        gain = get_gain_band(input_file)
+    
+    # Loop over all bands in dataset
+    for b in range(dataset.RasterCount):
+        # Remember, GDAL index is on 1, but Python is on 0 -- so we add 1 for our GDAL calls
+        band = dataset.GetRasterBand(b + 1)
+        # Read in the band's data into the third dimension of our array
+        if calc_gain == True:
+            # calc gain value for each bands
+            image[:, :, b] = band.ReadAsArray() * gain[b]
+        else:
+            image[:, :, b] = band.ReadAsArray()
+    return image, dataset
+
+def _band_gains(input_file, calc_gain, count):
+    """
+    gain per band as a float32 array, or None if no gain is requested.
+    """
+    if not calc_gain:
+        return None
+    gain = np.asarray(get_gain_band(input_file)[:count], dtype=np.float32)
+    if gain.size != count:
+        raise ValueError("Expected %d GAIN_BAND entries for %s, found %d."
+                         % (count, input_file, gain.size))
+    return gain
+
+def block_size(dataset):
+    """
+    natural block size (xsize, ysize) of the dataset, from its first band.
+    """
+    return tuple(dataset.GetRasterBand(1).GetBlockSize())
+
+def read_window(dataset, xoff, yoff, xsize, ysize, gain=None):
+    """
+    read a window of all bands in one multi-band request.
+    Inputs:
+        dataset : gdal dataset.
+        xoff, yoff, xsize, ysize (int) : window in pixels.
+        gain (np.array) : per-band gain, or None.
+    return:
+        window(np.array) : (ysize, xsize, bands) in the native dtype, or
+                           float32 with the gain applied in place if gain is given.
+    """
+    window = dataset.ReadAsArray(xoff, yoff, xsize, ysize, interleave='pixel')
+    if window.ndim == 2:
+        window = window[:, :, np.newaxis]
+    if gain is not None:
+        window = window.astype(np.float32, copy=False)
+        window *= gain
+    return window
+
+def iter_blocks(input_file, calc_gain=False, rows_per_block=None):
+    """
+    iterate over a GeoTiff in block-aligned windows, without materializing it.
+    Inputs:
+        input_file (str) : the name of input GeoTiff file.
+        calc_gain (bool) : whether to apply GAIN to DN (default:False).
+        rows_per_block (int) : window height. Defaults to the native block height,
+                               rounded up to a multiple of it otherwise.
+    yield:
+        (xoff, yoff, window) : window as returned by read_window().
+    """
+    dataset = gdal.Open(input_file, gdal.GA_ReadOnly)
+    gain = _band_gains(input_file, calc_gain, dataset.RasterCount)
+    bx, by = block_size(dataset)
+    if rows_per_block is not None:
+        by = max(by, -(-rows_per_block // by) * by)
+    # Striped files have full-width blocks, tiled files are read one block column at a time.
+    for yoff in range(0, dataset.RasterYSize, by):
+        ysize = min(by, dataset.RasterYSize - yoff)
+        for xoff in range(0, dataset.RasterXSize, bx):
+            xsize = min(bx, dataset.RasterXSize - xoff)
+            yield xoff, yoff, read_window(dataset, xoff, yoff, xsize, ysize, gain)
+
+def tif2array_native(input_file, calc_gain=False):
+    """
+    read GeoTiff into a numpy.ndarray keeping the band's native dtype.
+    Inputs:
+        input_file (str) : the name of input GeoTiff file.
+        calc_gain (bool) : whether to apply GAIN to DN (default:False). If set,
+                           the image is float32.
+    return:
+        image(np.array) : (Y, X, bands) image.
+        dataset : for gdal's data drive.
+    """
+    dataset = gdal.Open(input_file, gdal.GA_ReadOnly)
+    gain = _band_gains(input_file, calc_gain, dataset.RasterCount)
+    image = read_window(dataset, 0, 0, dataset.RasterXSize, dataset.RasterYSize, gain)
+    return image, dataset
+
+def array2raster(newRasterfn, dataset, array, dtype):
+    """
+    save GTiff file from numpy.array
+    input:
+        newRasterfn: save file name
+        dataset : original tif file
+        array : numpy.array
+        dtype: Byte or Float32.
+    """
+    cols = array.shape[1]
+    rows = array.shape[0]
+    originX, pixelWidth, b, originY, d, pixelHeight = dataset.GetGeoTransform() 
+
+    driver = gdal.GetDriverByName('GTiff')
+
+    # set data type to save.
+    GDT_dtype = gdal.GDT_Unknown
+    if dtype == "Byte": 
+        GDT_dtype = gdal.GDT_Byte
+    elif dtype == "Float32":
+        GDT_dtype = gdal.GDT_Float32
+    else:
+        print("Not supported data type.")
+
+    # set number of band.
+    if array.ndim == 2:
+        band_num = 1
+    else:
+        band_num = array.shape[2]
+
+    outRaster = driver.Create(newRasterfn, cols, rows, band_num, GDT_dtype)
+    outRaster.SetGeoTransform((originX, pixelWidth, 0, originY, 0, pixelHeight))
+
+    # Loop over all bands.
+    for b in range(band_num):
+        outband = outRaster.GetRasterBand(b + 1)
+        # Read in the band's data into the third dimension of our array
+        if band_num == 1:
+            outband.WriteArray(array)
+        else:
+            outband.WriteArray(array[:,:,b])
+
+    # setteing srs from input tif file.
+    prj=dataset.GetProjection()
+    outRasterSRS = osr.SpatialReference(wkt=prj)
+    outRaster.SetProjection(outRasterSRS.ExportToWkt())
+    outband.FlushCache()
+
+class COGWriter:
+    """
+    Streaming Cloud-Optimized GeoTiff writer. Windows are written to an
+    internally tiled and compressed GTiff, and on close() the overviews are
+    built with several threads and the file is laid out as a COG.
+    Usage:
+        with COGWriter("out.tif", X, Y, 3, np.uint8, dataset=ds) as w:
+            for xoff, yoff, window in iter_blocks("in.tif"):
+                w.write(window, xoff, yoff)
+    """
+
+    COMPRESSIONS = ("DEFLATE", "ZSTD", "LZMA", "JPEG", "LZW", "NONE")
+
+    """ Compressions with a LEVEL option, the others take no quality but JPEG """
+    LEVELED = ("DEFLATE", "ZSTD", "LZMA")
+
+    def __init__(self, filename, xsize, ysize, bands, dtype, dataset=None,
+                 compress="DEFLATE", quality=None, blocksize=512,
+                 resampling="AVERAGE", num_threads="ALL_CPUS"):
+        """
+        Inputs:
+            filename (str) : output COG file name.
+            xsize, ysize, bands (int) : raster dimensions.
+            dtype : numpy dtype of the windows to write.
+            dataset : gdal dataset to copy geotransform and projection from, or None.
+            compress (str) : one of COMPRESSIONS.
+            quality (int) : JPEG quality or DEFLATE/ZSTD/LZMA level, or None for the default.
+            blocksize (int) : internal tile size in pixels.
+            resampling (str) : overview resampling (AVERAGE, BILINEAR, CUBIC, NEAREST...).
+            num_threads : worker threads used to compress and build overviews.
+        """
+        compress = compress.upper()
+        if compress not in self.COMPRESSIONS:
+            raise ValueError("Unsupported compression: %s" % compress)
+        if compress == "JPEG" and np.dtype(dtype) != np.uint8:
+            raise ValueError("JPEG compression needs 8-bit data, got %s" % np.dtype(dtype))
+        if quality is not None and compress != "JPEG" and compress not in self.LEVELED:
+            raise ValueError("%s compression takes no quality or level" % compress)
+
+        self.filename = filename
+        self.compress = compress
+        self.quality = quality
+        self.blocksize = blocksize
+        self.resampling = resampling
+        self.num_threads = str(num_threads)
+        self.tmpfilename = filename + ".tmp.tif"
+
+        gdt = gdal_array.NumericTypeCodeToGDALTypeCode(np.dtype(dtype))
+        if gdt is None:
+            raise ValueError("Unsupported data type: %s" % np.dtype(dtype))
+
+        # Intermediate tiles are compressed losslessly, only the final copy is JPEG.
+        options = ["TILED=YES", "BLOCKXSIZE=%d" % blocksize, "BLOCKYSIZE=%d" % blocksize,
+                   "COMPRESS=%s" % ("DEFLATE" if compress == "JPEG" else compress),
+                   "NUM_THREADS=%s" % self.num_threads, "BIGTIFF=IF_SAFER"]
+        if bands > 1:
+            options.append("INTERLEAVE=PIXEL")
+        driver = gdal.GetDriverByName("GTiff")
+        self.raster = driver.Create(self.tmpfilename, xsize, ysize, bands, gdt, options=options)
+        if self.raster is None:
+            raise RuntimeError("Could not create %s: %s" % (self.tmpfilename, gdal.GetLastErrorMsg()))
+        if dataset is not None:
+            self.raster.SetGeoTransform(dataset.GetGeoTransform())
+            self.raster.SetProjection(dataset.GetProjection())
+
+    def write(self, window, xoff=0, yoff=0):
+        """
+        write a (Y, X) or (Y, X, bands) window at the given pixel offset.
+        """
+        if window.ndim == 2:
+            window = window[:, :, np.newaxis]
+        self.raster.WriteArray(window, xoff, yoff, interleave='pixel')
+
+    def write_blocks(self, blocks):
+        """
+        write an iterable of (xoff, yoff, window), e.g. from iter_blocks().
+        """
+        for xoff, yoff, window in blocks:
+            self.write(window, xoff, yoff)
+
+    def close(self):
+        """
+        build the overviews and lay out the final COG.
+        """
+        if self.raster is None:
+            return
+        try:
+            with gdal.config_options({"GDAL_NUM_THREADS": self.num_threads,
+                                      "COMPRESS_OVERVIEW": "DEFLATE"}):
+                if self.raster.BuildOverviews(self.resampling, overviewlist=self._overview_factors()) != gdal.CE_None:
+                    raise RuntimeError("Could not build the overviews of %s: %s"
+                                       % (self.filename, gdal.GetLastErrorMsg()))
+            self.raster.FlushCache()
+
+            options = ["COMPRESS=%s" % self.compress, "BLOCKSIZE=%d" % self.blocksize,
+                       "OVERVIEWS=FORCE_USE_EXISTING", "NUM_THREADS=%s" % self.num_threads,
+                       "BIGTIFF=IF_SAFER"]
+            if self.quality is not None:
+                options.append(("QUALITY=%d" if self.compress == "JPEG" else "LEVEL=%d") % self.quality)
+            out = gdal.GetDriverByName("COG").CreateCopy(self.filename, self.raster, options=options)
+            if out is None:
+                raise RuntimeError("Could not write %s: %s" % (self.filename, gdal.GetLastErrorMsg()))
+            out = None
+        finally:
+            self.raster = None
+            gdal.GetDriverByName("GTiff").Delete(self.tmpfilename)
+
+    def _overview_factors(self):
+        factors = []
+        size = max(self.raster.RasterXSize, self.raster.RasterYSize)
+        factor = 2
+        while size / factor >= self.blocksize / 2:
+            factors.append(factor)
+            factor *= 2
+        return factors
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.raster = None
+            gdal.GetDriverByName("GTiff").Delete(self.tmpfilename)
+        return False
+
+def bounds_wgs84(dataset):
+    """
+    bounding box of a dataset in WGS84 longitude/latitude.
+    return:
+        (lon0, lat0, lon1, lat1) : the box, widened to the full longitude range
+                                   when it contains a pole or crosses the antimeridian.
+    """
+    srs = osr.SpatialReference(wkt=dataset.GetProjection())
+    wgs84 = osr.SpatialReference()
+    wgs84.ImportFromEPSG(4326)
+    for s in (srs, wgs84):
+        s.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+
+    x0, px, _, y0, _, py = dataset.GetGeoTransform()
+    x1 = x0 + px * dataset.RasterXSize
+    y1 = y0 + py * dataset.RasterYSize
+    minx, maxx = min(x0, x1), max(x0, x1)
+    miny, maxy = min(y0, y1), max(y0, y1)
+
+    ct = osr.CoordinateTransformation(srs, wgs84)
+    lon0, lat0, lon1, lat1 = ct.TransformBounds(minx, miny, maxx, maxy, 21)
+    if lon0 > lon1:
+        # Crosses the antimeridian.
+        lon0, lon1 = -180.0, 180.0
+
+    # Polar projections may contain the pole, which edge sampling misses.
+    inverse = osr.CoordinateTransformation(wgs84, srs)
+    for pole in (90.0, -90.0):
+        try:
+            px, py, _ = inverse.TransformPoint(0.0, pole)
+        except RuntimeError:
+            continue
+        if minx <= px <= maxx and miny <= py <= maxy:
+            lon0, lon1 = -180.0, 180.0
+            lat0, lat1 = min(lat0, pole), max(lat1, pole)
+    return lon0, lat0, lon1, lat1
+
+def warp_tile(dataset, lon0, lat0, lon1, lat1, tilesize, resampling="cubic"):
+    """
+    warp the part of a dataset covering a lon/lat box into an equirectangular tile.
+    Only the source window needed for the box is read.
+    Inputs:
+        dataset : gdal dataset, in any CRS.
+        lon0, lat0, lon1, lat1 (float) : tile box.
+        tilesize (int) : output size in pixels.
+        resampling (str) : gdal resampling algorithm.
+    return:
+        tile(np.array) : (tilesize, tilesize, bands) in the native dtype, or None
+                         if the source does not cover any pixel of the tile. A source
+                         alpha band is kept last, masked by the coverage of the tile.
+    """
+    src_alpha = dataset.GetRasterBand(dataset.RasterCount).GetColorInterpretation() == gdal.GCI_AlphaBand
+    out = gdal.Warp("", dataset, format="MEM", dstSRS="EPSG:4326",
+                    outputBounds=(min(lon0, lon1), min(lat0, lat1), max(lon0, lon1), max(lat0, lat1)),
+                    width=tilesize, height=tilesize, resampleAlg=resampling,
+                    srcAlpha=src_alpha, dstAlpha=True, multithread=False)
+    tile = read_window(out, 0, 0, tilesize, tilesize)
+    # The last band is the destination alpha: the coverage, times the source alpha if any.
+    if not tile[:, :, out.RasterCount - 1].any():
+        return None
+    return tile if src_alpha else tile[:, :, :out.RasterCount - 1]
@@ -0,0 +1,120 @@
+"""
+Tile math for spherical virtual textures. Level L has 2^(L+1) columns and
+2^L rows covering longitude [-180°, 180°] and latitude [-90°, 90°], with
+row 0 at the north pole.
+
+This module only depends on the standard library, so that it imports fast.
+Location lookups (geopy) and the land mask (global_land_mask) are imported
+when first used.
+"""
+
+import math
+
+def level_shape(level):
+    """ Number of (columns, rows) at the given level. """
+    return 2 ** (level + 1), 2 ** level
+
+def uvToLatLon(u, v):
+    lon = u * 360.0 - 180.0
+    lat = v * 180.0 - 90.0
+    return lon, lat
+
+def latLonToUV(lat, lon):
+    u = (lon + 180.0) / 360.0
+    v = (lat + 90.0) / 180.0
+    return u, v
+
+def colRowToUV(c, r, nc, nr):
+    u = c / nc
+    v = 1.0 - (r / nr)
+    return u, v
+
+def latLonToColRow(lat, lon, nc, nr):
+    u, v = latLonToUV(lat, lon)
+    col = min(int(math.floor(u * nc)), nc - 1)
+    row = min(int(math.floor((1.0 - v) * nr)), nr - 1)
+    return col, row
+
+def tileExtent(col, row, nc, nr):
+    u0, v0 = colRowToUV(col, row, nc, nr)
+    u1, v1 = colRowToUV(col + 1, row + 1, nc, nr)
+    lon0, lat0 = uvToLatLon(u0, v0)
+    lon1, lat1 = uvToLatLon(u1, v1)
+    return (lon0, lat0, lon1, lat1), (u0, v0, u1, v1)
+
+def extent(a, b):
+    return [abs(b[0] - a[0]), abs(b[1] - a[1])]
+
+def tiles_in_bbox(lon0, lat0, lon1, lat1, level):
+    """
+    Columns and rows of the tiles at the given level that intersect the
+    (lon0, lat0)-(lon1, lat1) box, as two ranges.
+    """
+    nc, nr = level_shape(level)
+    minlon, maxlon = min(lon0, lon1), max(lon0, lon1)
+    minlat, maxlat = min(lat0, lat1), max(lat0, lat1)
+    c0, r0 = latLonToColRow(maxlat, minlon, nc, nr)
+    c1, r1 = latLonToColRow(minlat, maxlon, nc, nr)
+    # A box ending exactly on a tile edge does not touch the next tile.
+    u1, v1 = latLonToUV(minlat, maxlon)
+    if c1 > c0 and u1 * nc == c1:
+        c1 -= 1
+    if r1 > r0 and (1.0 - v1) * nr == r1:
+        r1 -= 1
+    return range(c0, c1 + 1), range(r0, r1 + 1)
+
+def tile_for_latlon(lat, lon, level):
+    """
+    Column and row of the tile containing the given point at the given level.
+    """
+    nc, nr = level_shape(level)
+    return latLonToColRow(lat, lon, nc, nr)
+
+def get_svt_tile_bbox(lat, lon, level):
+    """
+    Box [minlon, minlat, maxlon, maxlat], column and row of the tile
+    containing the given point at the given level.
+    """
+    nc = 2 ** (level + 1)
+    nr = 2 ** level
+
+    u = (lon + 180.0) / 360.0
+    v = (lat + 90.0) / 180.0
+
+    col = int(u * nc)
+    row = int((1.0 - v) * nr)
+
+    u0 = col / nc
+    v0 = 1.0 - (row / nr)
+    u1 = (col + 1) / nc
+    v1 = 1.0 - ((row + 1) / nr)
+
+    lon0 = u0 * 360.0 - 180.0
+    lat0 = v0 * 180.0 - 90.0
+    lon1 = u1 * 360.0 - 180.0
+    lat1 = v1 * 180.0 - 90.0
+
+    return [lon0, lat1, lon1, lat0], col, row
+
+def get_lat_lon(location_name):
+    """
+    Resolves a location name to (latitude, longitude) with Nominatim, or None.
+    """
+    from geopy.geocoders import Nominatim
+    geolocator = Nominatim(user_agent="geoapi")
+    location = geolocator.geocode(location_name)
+    if location:
+        return (location.latitude, location.longitude)
+    else:
+        return None
+
+def tile_has_land(lat0, lon0, lat1, lon1, resolution=10):
+    """
+    Returns True if ANY point within the lat/lon rectangle is land.
+    """
+    import numpy as np
+    from global_land_mask import globe
+    lats = np.linspace(lat0, lat1, resolution)
+    lons = np.linspace(lon0, lon1, resolution)
+    lon_grid, lat_grid = np.meshgrid(lons, lats)
+    return globe.is_land(lat_grid, lon_grid).any()
@@ -0,0 +1,170 @@
+"""
+Verifies the levels of a tile pyramid by reading only the JPEG/PNG headers
+and end markers of the tiles. Reports missing, duplicate, mis-sized and
+corrupt (or truncated) tiles per level.
+"""
+
+import os
+import re
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from vttools import headers, tiles
+
+TILE_RE = re.compile(r"^tx_(\d+)_(\d+)\.(\w+)$")
+LEVEL_RE = re.compile(r"^level(\d+)$")
+
+"""
+Result of the verification of a level.
+    level : the level.
+    directory : where its tiles are.
+    expected : number of tiles expected.
+    found : number of distinct tiles found.
+    tilesize : (width, height) tiles must have.
+    missing : [(col, row)] of expected tiles that are not there.
+    duplicates : [(col, row, [files])] of tiles present more than once (e.g. .jpg and .png).
+    missized : [(file, width, height)] of tiles with the wrong dimensions.
+    corrupt : [(file, reason)] of tiles with a bad header or no end marker.
+    unexpected : [file] of tiles outside the expected set.
+"""
+LevelReport = namedtuple("LevelReport", ["level", "directory", "expected", "found", "tilesize",
+                                         "missing", "duplicates", "missized", "corrupt", "unexpected"])
+
+def ok(report):
+    """ Whether a level report has no problems. """
+    return not (report.missing or report.duplicates or report.missized or report.corrupt)
+
+def find_levels(directory):
+    """
+    {level: path} of the 'levelLL' directories in directory.
+    """
+    levels = {}
+    for name in os.listdir(directory):
+        match = LEVEL_RE.match(name)
+        if match is not None and os.path.isdir(os.path.join(directory, name)):
+            levels[int(match.group(1))] = os.path.join(directory, name)
+    return levels
+
+def level_tiles(level, root=None):
+    """
+    Set of (col, row) of a level: all 2^(l+1) x 2^l tiles, or those in the
+    subtree of the (level, col, row) root.
+    """
+    if root is not None:
+        rl, rc, rr = root
+        if level < rl:
+            return set()
+        d = level - rl
+        cols = range(rc << d, (rc + 1) << d)
+        rows = range(rr << d, (rr + 1) << d)
+    else:
+        nc, nr = tiles.level_shape(level)
+        cols, rows = range(nc), range(nr)
+    return {(c, r) for r in rows for c in cols}
+
+def land_tiles(level, candidates):
+    """
+    The (col, row) candidates of a level that have some land.
+    """
+    nc, nr = tiles.level_shape(level)
+    def has_land(cr):
+        (lon0, lat0, lon1, lat1), _ = tiles.tileExtent(cr[0], cr[1], nc, nr)
+        return tiles.tile_has_land(lat1, lon0, lat0, lon1)
+    return set(filter(has_land, candidates))
+
+def expected_tiles(level, root=None, skip_water=False):
+    """
+    Set of (col, row) expected at a level, minus the all-water tiles if
+    skip_water is set.
+    """
+    candidates = level_tiles(level, root)
+    return land_tiles(level, candidates) if skip_water else candidates
+
+def check_tile(path):
+    """
+    (width, height, problem) of a tile file, where problem is None if the
+    header and end marker are fine.
+    """
+    try:
+        width, height, _, complete = headers.inspect(path)
+    except (OSError, ValueError) as e:
+        return None, None, str(e)
+    return width, height, None if complete else "truncated, no end marker"
+
+def verify_level(level, directory, tilesize=None, root=None, skip_water=False, workers=16, metrics=None):
+    """
+    Verifies the tiles of a level.
+    Inputs:
+        level (int) : the level.
+        directory (str) : the directory with its tiles.
+        tilesize (int) : expected tile size, or None to use the most common one.
+        root ((int, int, int)) : only expect the subtree of this (level, col, row) tile.
+        skip_water (bool) : do not expect the all-water tiles.
+        workers (int) : threads reading the headers.
+        metrics (Metrics) : where to record progress, or None.
+    return:
+        LevelReport
+    """
+    files = {}
+    for name in os.listdir(directory):
+        match = TILE_RE.match(name)
+        if match is not None:
+            files.setdefault((int(match.group(1)), int(match.group(2))), []).append(name)
+
+    names = [name for group in files.values() for name in group]
+    if metrics is not None:
+        metrics.add_total(len(names))
+
+    def check(name):
+        result = check_tile(os.path.join(directory, name))
+        if metrics is not None:
+            metrics.count("tiles")
+            metrics.advance()
+        return result
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        checks = dict(zip(names, pool.map(check, names)))
+
+    corrupt = sorted((name, problem) for name, (_, _, problem) in checks.items() if problem is not None)
+    sizes = Counter((w, h) for w, h, problem in checks.values() if w is not None)
+    if tilesize is not None:
+        size = (tilesize, tilesize)
+    else:
+        size = sizes.most_common(1)[0][0] if sizes else None
+    missized = sorted((name, w, h) for name, (w, h, _) in checks.items()
+                      if w is not None and (w, h) != size)
+
+    candidates = level_tiles(level, root)
+    expected = land_tiles(level, candidates) if skip_water else candidates
+    present = set(files)
+    duplicates = sorted((c, r, sorted(group)) for (c, r), group in files.items() if len(group) > 1)
+    # Water tiles are not expected, but they are fine if they are there.
+    unexpected = sorted(name for cr in present - candidates for name in files[cr])
+
+    return LevelReport(level, directory, len(expected), len(present & expected), size,
+                       sorted(expected - present, key=lambda cr: (cr[1], cr[0])),
+                       duplicates, missized, corrupt, unexpected)
+
+def verify_pyramid(directory, levels=None, tilesize=None, root=None, skip_water=False, workers=16, metrics=None):
+    """
+    Verifies the 'levelLL' directories found in directory.
+    Inputs:
+        levels (list) : levels to verify, or None for all the ones found. Requested
+                        levels without a directory are reported as fully missing.
+        See verify_level() for the rest.
+    return:
+        [LevelReport] : sorted by level.
+    """
+    found = find_levels(directory)
+    if levels is None:
+        levels = sorted(found)
+    reports = []
+    for level in levels:
+        path = found.get(level)
+        if path is None:
+            expected = expected_tiles(level, root, skip_water)
+            reports.append(LevelReport(level, None, len(expected), 0, None,
+                                       sorted(expected, key=lambda cr: (cr[1], cr[0])), [], [], [], []))
+        else:
+            reports.append(verify_level(level, path, tilesize, root, skip_water, workers, metrics))
+    return reports
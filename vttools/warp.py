@@ -0,0 +1,152 @@
+"""
+Warps any GDAL-readable raster, in any projection, straight into the
+equirectangular tiles "tx_C_R.ext" of a given SVT level. Each tile is warped
+independently from the source window it needs, in a pool of worker
+processes, so no full-size intermediate image is created.
+"""
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+
+from vttools import encoders, imaging, tiles
+from vttools.metrics import Metrics
+
+""" Source dataset, opened once per worker process """
+dataset = None
+
+def init_worker(filename):
+    global dataset
+    from osgeo import gdal
+    gdal.UseExceptions()
+    dataset = gdal.Open(filename, gdal.GA_ReadOnly)
+
+def warp_one(level, col, row, tilesize, resampling, outdir, encoder):
+    """
+    Warps and writes a single tile. Returns the file name (None if the
+    source does not cover the tile), the bytes written and the
+    {stage: (seconds, calls)} timings.
+    """
+    from vttools import tif
+    nc, nr = tiles.level_shape(level)
+    (lon0, lat0, lon1, lat1), _ = tiles.tileExtent(col, row, nc, nr)
+    t0 = time.perf_counter()
+    tile = tif.warp_tile(dataset, lon0, lat0, lon1, lat1, tilesize, resampling)
+    t1 = time.perf_counter()
+    if tile is None:
+        return None, 0, {"warp": (t1 - t0, 1)}
+
+    # GDAL gives RGB(A), OpenCV expects BGR(A).
+    tile = imaging.rgb_to_bgr(tile)
+    out = os.path.join(outdir, f"tx_{col}_{row}.{encoder.format}")
+    m = Metrics(progress=False)
+    imaging.save_tile(out, tile, encoder, m)
+    stages = {"warp": (t1 - t0, 1)}
+    stages.update(m.stages)
+    return out, m.bytes["written"], stages
+
+def open_raster(filename):
+    """
+    Opens a georeferenced raster with GDAL.
+    raises:
+        ValueError : if GDAL cannot read it, or it has no projection or geotransform.
+    """
+    from osgeo import gdal
+    gdal.UseExceptions()
+    try:
+        ds = gdal.Open(filename, gdal.GA_ReadOnly)
+    except RuntimeError as e:
+        raise ValueError("cannot read %s: %s" % (filename, e))
+    if not ds.GetProjection():
+        raise ValueError("%s has no projection, it cannot be placed on the sphere" % filename)
+    if ds.GetGeoTransform(can_return_null=True) is None:
+        raise ValueError("%s has no geotransform, it cannot be placed on the sphere" % filename)
+    return ds
+
+def raster_tiles(dataset, level):
+    """
+    Bounds of the raster in WGS84, and the columns and rows of the tiles of
+    the level it covers.
+    return:
+        (lon0, lat0, lon1, lat1), cols (range), rows (range)
+    raises:
+        ValueError : if the bounds cannot be transformed to WGS84.
+    """
+    from vttools import tif
+    try:
+        bounds = tif.bounds_wgs84(dataset)
+    except RuntimeError as e:
+        raise ValueError("cannot transform the bounds of the raster to WGS84: %s" % e)
+    cols, rows = tiles.tiles_in_bbox(*bounds, level)
+    return bounds, cols, rows
+
+def warp_tiles(filename, level, tilesize=1024, outdir='.', workers=None, resampling='cubic',
+               format='jpg', quality=95, metrics=None, encoder=None):
+    """
+    Warps the raster into the tiles of the given level it covers. At most a
+    few tiles per worker are queued at a time, so that rasters that cover many
+    tiles do not queue them all, and a failure stops the run early.
+    Inputs:
+        filename (str) : any GDAL-readable raster.
+        level (int) : SVT level of the produced tiles.
+        tilesize (int) : resolution of the produced tiles.
+        outdir (str) : output directory.
+        workers (int) : number of worker processes, or None for the number of CPUs.
+        resampling (str) : gdal resampling algorithm.
+        format (str) : output format, one of encoders.FORMATS.
+        quality (int) : JPG, WEBP and AVIF quality in [1, 100].
+        metrics (Metrics) : where to record timings and progress, or None.
+        encoder (Encoder) : encoder of the tiles, with its options. Overrides format and quality.
+    return:
+        (written, empty) : tiles written, and candidate tiles not covered by the raster.
+    raises:
+        ValueError : if the raster cannot be read or placed on the sphere, or the
+                     format cannot hold its data type.
+    """
+    from osgeo import gdal
+    ds = open_raster(filename)
+    encoder = encoders.get(encoder, format, quality)
+    if encoder.format != 'png' and ds.GetRasterBand(1).DataType != gdal.GDT_Byte:
+        raise ValueError("%s output needs an 8-bit raster, use png instead." % encoder.format.upper())
+    (lon0, lat0, lon1, lat1), cols, rows = raster_tiles(ds, level)
+    ds = None
+
+    m = metrics if metrics is not None else Metrics(progress=False)
+    candidates = len(cols) * len(rows)
+    m.log(f"Bounds: ({lon0:.3f}, {lat0:.3f}) -> ({lon1:.3f}, {lat1:.3f})")
+    m.log(f"Tiles: cols {cols.start}-{cols.stop - 1}, rows {rows.start}-{rows.stop - 1} ({candidates} candidates)")
+    m.add_total(candidates)
+    os.makedirs(outdir, exist_ok=True)
+
+    written = 0
+
+    def collect(future):
+        nonlocal written
+        out, nbytes, stages = future.result()
+        m.merge_stages(stages)
+        if out is not None:
+            written += 1
+            m.count("tiles")
+            m.add_bytes("written", nbytes)
+        else:
+            m.count("empty")
+        m.advance()
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(filename,)) as pool:
+        pending = set()
+        try:
+            for row in rows:
+                for col in cols:
+                    if len(pending) >= 4 * workers:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            collect(future)
+                    pending.add(pool.submit(warp_one, level, col, row, tilesize, resampling, outdir, encoder))
+            for future in as_completed(pending):
+                collect(future)
+        except BaseException:
+            # Do not wait for the queued tiles before reporting the error.
+            pool.shutdown(cancel_futures=True)
+            raise
+    return written, candidates - written
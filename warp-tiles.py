@@ -0,0 +1,58 @@
+#! /usr/bin/env python
+
+"""
+This script warps any GDAL-readable raster, in any projection,
+straight into the equirectangular tiles "tx_C_R.ext" of the given
+SVT level. Each tile is warped independently from the source
+window it needs, so no full-size intermediate image is created.
+"""
+
+import argparse
+import os
+import sys
+
+from vttools import cli, encoders, metrics
+from vttools.warp import warp_tiles
+
+
+def parse_args():
+    # Instantiate the parser
+    parser = argparse.ArgumentParser(description='Warp the given raster, in any projection GDAL understands, into the equirectangular tiles of an SVT level, named tx_C_R.ext, where C is the column and R is the row, all zero-based.')
+
+    # Required positional arguments
+    parser.add_argument('LEVEL', type=int,
+                        help='SVT level of the produced tiles.')
+    parser.add_argument('FILE',
+                        type=lambda x: cli.is_valid_file(parser, x),
+                        help='The input raster. Any GDAL-readable format and projection.')
+    # Optional arguments
+    parser.add_argument('-s', '--tilesize', type=int, default=1024,
+                        help='Resolution of the produced tiles. Defaults to 1024.')
+    parser.add_argument('-o', '--output', type=str, default='.',
+                        help='Output directory. Defaults to the current directory.')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(),
+                        help='Number of worker processes. Defaults to the number of CPUs.')
+    parser.add_argument('--resampling', type=str, default='cubic',
+                        choices=['near', 'bilinear', 'cubic', 'cubicspline', 'lanczos', 'average'],
+                        help='Resampling algorithm. Defaults to cubic.')
+    encoders.add_arguments(parser)
+    metrics.add_arguments(parser)
+
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    m = metrics.from_args(args, label="warp")
+
+    print("Input: %s" % args.FILE)
+    try:
+        encoder = encoders.from_args(args)
+        written, empty = warp_tiles(args.FILE, args.LEVEL, args.tilesize, args.output, args.workers,
+                                    args.resampling, metrics=m, encoder=encoder)
+    except ValueError as e:
+        print("Error: %s" % e)
+        sys.exit(1)
+    m.close()
+
+    print(f"Done. Wrote {written} tiles, {empty} were not covered by the input.")